@@ -1,4 +1,8 @@
+from fastapi import HTTPException
 from app.services.events.get_events_datatable_service import get_events_datatable
+from app.services.events.get_events_service import get_event_statistics
+from app.services.events.get_events_timeseries_service import get_events_timeseries
+from app.services.events.export_events_service import start_events_export, get_events_export_status
 
 
 def events_datatable_controller(
@@ -7,7 +11,8 @@ def events_datatable_controller(
     length: int,
     search_value: str,
     order_column: int,
-    order_dir: str
+    order_dir: str,
+    cursor: str = None
 ):
     """
     Controller for DataTables API endpoint
@@ -19,6 +24,7 @@ def events_datatable_controller(
         search_value: Search keyword
         order_column: Column index to sort
         order_dir: Sort direction
+        cursor: Keyset cursor from the previous page
     
     Returns:
         DataTables response dictionary
@@ -29,5 +35,80 @@ def events_datatable_controller(
         length=length,
         search_value=search_value,
         order_column=order_column,
-        order_dir=order_dir
-    )
\ No newline at end of file
+        order_dir=order_dir,
+        cursor=cursor
+    )
+
+
+def events_stats_controller(window_minutes: int = None):
+    """
+    Controller for the events summary counters
+    
+    Args:
+        window_minutes: Only count the last N minutes (all time if None)
+    
+    Returns:
+        Dict with total_allowed, total_blocked, threats_detected
+    """
+    return get_event_statistics(window_minutes=window_minutes)
+
+
+def events_timeseries_controller(
+    range_minutes: int,
+    end: int = None,
+    resolution: int = None,
+    group_by: str = "action",
+    segment: str = None,
+    action: str = None
+):
+    """
+    Controller for the events chart API
+    
+    Args:
+        range_minutes: Window length in minutes
+        end: Window end (epoch seconds), now if None
+        resolution: Bucket size in seconds, automatic if None
+        group_by: action, segment or reason
+        segment: Optional segment filter
+        action: Optional action filter
+    
+    Returns:
+        Time series dictionary
+    """
+    try:
+        return get_events_timeseries(
+            range_minutes=range_minutes,
+            end=end,
+            resolution=resolution,
+            group_by=group_by,
+            segment=segment,
+            action=action
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def events_export_controller(fmt: str = None):
+    """
+    Controller for starting a columnar export of closed event segments
+    
+    Args:
+        fmt: parquet, mfwcol or auto
+    
+    Returns:
+        Export status dictionary
+    """
+    try:
+        return start_events_export(fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def events_export_status_controller():
+    """
+    Controller for the columnar export progress
+    
+    Returns:
+        Export status dictionary
+    """
+    return get_events_export_status()
@@ -8,7 +8,8 @@ from app.services.policy.get_policy_service import (
     get_features,
     get_enforcement,
     get_collectors,
-    get_burst
+    get_burst,
+    get_segment_for_ip
 )
 from app.services.policy.update_policy_service import (
     update_segment,
@@ -106,3 +107,11 @@ def update_burst_controller(dns_queries_per_minute_monitor: int, dns_queries_per
         update_burst(dns_queries_per_minute_monitor, dns_queries_per_minute_block)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+def segment_lookup_controller(ip: str):
+    """Resolve the segment a client IP belongs to"""
+    try:
+        return {"ip": ip, "segment": get_segment_for_ip(ip)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
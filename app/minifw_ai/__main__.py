@@ -1,2 +1,20 @@
+import sys
+
+if len(sys.argv) > 1 and sys.argv[1] == "replay":
+    from minifw_ai.replay import main
+    sys.exit(main(sys.argv[2:]))
+
+if len(sys.argv) > 1 and sys.argv[1] == "loadgen":
+    from minifw_ai.loadgen import main
+    sys.exit(main(sys.argv[2:]))
+
+if len(sys.argv) > 1 and sys.argv[1] == "export-jsonl":
+    from minifw_ai.events import export_main
+    sys.exit(export_main(sys.argv[2:]))
+
+if len(sys.argv) > 1 and sys.argv[1] == "export-columnar":
+    from minifw_ai.columnar import main
+    sys.exit(main(sys.argv[2:]))
+
 from minifw_ai.main import run
 run()
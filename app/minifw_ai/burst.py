@@ -1,16 +1,77 @@
 from __future__ import annotations
-from collections import deque, defaultdict
+from array import array
+from collections import OrderedDict
 import time
 
+class _Ring:
+    """Per-client ring of per-second counters covering one window."""
+    __slots__ = ("counts", "last", "total")
+
+    def __init__(self, window: int, now: int):
+        self.counts = array("I", bytes(4 * window))
+        self.last = now
+        self.total = 0
+
 class BurstTracker:
-    def __init__(self, window_seconds: int = 60):
-        self.window = window_seconds
-        self.q = defaultdict(deque)
+    """Queries per client over a sliding window, in bounded memory.
+
+    Each client costs one fixed ``window``-slot array of per-second
+    counters, so ``add()`` is O(1) amortised regardless of rate. Clients
+    are kept in least-recently-seen order; idle ones (nothing in the
+    window) are evicted from the front as new queries come in, and the
+    least recently seen client is dropped when ``max_clients`` is reached.
+    """
+
+    def __init__(self, window_seconds: int = 60, max_clients: int = 100000):
+        self.window = max(int(window_seconds), 1)
+        self.max_clients = max(int(max_clients), 1)
+        self.q: OrderedDict[str, _Ring] = OrderedDict()
+        self.evicted = 0
 
     def add(self, ip: str) -> int:
-        now = time.time()
-        dq = self.q[ip]
-        dq.append(now)
-        while dq and (now - dq[0]) > self.window:
-            dq.popleft()
-        return len(dq)
+        now = int(time.time())
+        ring = self.q.get(ip)
+        if ring is None:
+            self._evict(now)
+            ring = self.q[ip] = _Ring(self.window, now)
+        else:
+            self.q.move_to_end(ip)
+            self._advance(ring, now)
+        ring.counts[now % self.window] += 1
+        ring.total += 1
+        return ring.total
+
+    def count(self, ip: str) -> int:
+        ring = self.q.get(ip)
+        if ring is None:
+            return 0
+        self._advance(ring, int(time.time()))
+        return ring.total
+
+    def _advance(self, ring: _Ring, now: int) -> None:
+        gap = now - ring.last
+        if gap <= 0:
+            return
+        counts = ring.counts
+        if gap >= self.window:
+            for i in range(self.window):
+                counts[i] = 0
+            ring.total = 0
+        else:
+            for s in range(ring.last + 1, now + 1):
+                i = s % self.window
+                ring.total -= counts[i]
+                counts[i] = 0
+        ring.last = now
+
+    def _evict(self, now: int) -> None:
+        q = self.q
+        while q:
+            ip, ring = next(iter(q.items()))
+            if now - ring.last < self.window and len(q) < self.max_clients:
+                break
+            del q[ip]
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return len(self.q)
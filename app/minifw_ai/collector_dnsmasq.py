@@ -1,17 +1,10 @@
 from __future__ import annotations
 import time
 from pathlib import Path
-from typing import Iterator, Tuple, Optional
+from typing import Tuple, Optional
 
-def tail_lines(path: Path) -> Iterator[str]:
-    with path.open("r", encoding="utf-8", errors="replace") as f:
-        f.seek(0, 2)
-        while True:
-            line = f.readline()
-            if not line:
-                time.sleep(0.2)
-                continue
-            yield line.strip()
+from minifw_ai.tailer import tail_lines
+from minifw_ai.metrics import STAGE_SECONDS
 
 def parse_dnsmasq(line: str) -> Optional[Tuple[str, str]]:
     if " query[" not in line or " from " not in line:
@@ -24,11 +17,14 @@ def parse_dnsmasq(line: str) -> Optional[Tuple[str, str]]:
     except Exception:
         return None
 
-def stream_dns_events(log_path: str):
+def stream_dns_events(log_path: str, checkpoint_path: str | None = None):
     p = Path(log_path)
     if not p.exists():
         raise FileNotFoundError(f"Missing dnsmasq log: {p}")
-    for ln in tail_lines(p):
+    parse_timer = STAGE_SECONDS.labels("parse")
+    for ln in tail_lines(p, checkpoint_path=Path(checkpoint_path) if checkpoint_path else None):
+        t0 = time.perf_counter()
         evt = parse_dnsmasq(ln)
+        parse_timer.observe(time.perf_counter() - t0)
         if evt:
             yield evt
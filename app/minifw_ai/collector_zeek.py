@@ -1,40 +1,107 @@
 from __future__ import annotations
+import json
 import time
 from pathlib import Path
-from typing import Iterator, Optional, Tuple
-
-def tail_lines(path: Path) -> Iterator[str]:
-    with path.open("r", encoding="utf-8", errors="replace") as f:
-        f.seek(0, 2)
-        while True:
-            line = f.readline()
-            if not line:
-                time.sleep(0.2)
-                continue
-            yield line.rstrip("\n")
+from typing import Optional, Tuple
+
+from minifw_ai.tailer import tail_lines
+from minifw_ai.metrics import STAGE_SECONDS
+
+# Zeek's stock ssl.log layout, used until a "#fields" header is seen
+DEFAULT_FIELDS = ["ts", "uid", "id.orig_h", "id.orig_p", "id.resp_h", "id.resp_p",
+                  "version", "cipher", "curve", "server_name"]
+
+class ZeekSSLParser:
+    """Stateful ssl.log parser for both TSV and JSON Zeek output.
+
+    TSV columns are located from the ``#separator`` / ``#fields`` header,
+    re-read whenever Zeek writes a new one (e.g. after rotation), so
+    ``id.orig_h`` and ``server_name`` are picked by position rather than
+    guessed. Lines starting with ``{`` are decoded as JSON logs.
+    """
+
+    def __init__(self):
+        self.sep = "\t"
+        self.unset = "-"
+        self._set_fields(DEFAULT_FIELDS)
+
+    def _set_fields(self, fields: list[str]) -> None:
+        self.fields = fields
+        try:
+            self.ip_idx = fields.index("id.orig_h")
+            self.sni_idx = fields.index("server_name")
+        except ValueError:
+            # header without the columns we need: ignore data until the next header
+            self.ip_idx = self.sni_idx = -1
+        self.min_cols = max(self.ip_idx, self.sni_idx) + 1
+
+    def _header(self, line: str) -> None:
+        if line.startswith("#separator"):
+            raw = line[len("#separator"):].strip()
+            try:
+                self.sep = raw.encode("ascii").decode("unicode_escape") or "\t"
+            except (UnicodeError, ValueError):
+                self.sep = "\t"
+        elif line.startswith("#unset_field"):
+            self.unset = line.split(self.sep, 1)[1] if self.sep in line else self.unset
+        elif line.startswith("#fields"):
+            self._set_fields(line.split(self.sep)[1:])
+
+    def parse(self, line: str) -> Optional[Tuple[str, str]]:
+        if not line:
+            return None
+        c = line[0]
+        if c == "#":
+            self._header(line)
+            return None
+        if c == "{":
+            # cheap pre-check: most TLS records without SNI need no decoding
+            if '"server_name"' not in line:
+                return None
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                return None
+            client_ip, sni = rec.get("id.orig_h"), rec.get("server_name")
+            if isinstance(client_ip, str) and isinstance(sni, str) and client_ip and sni:
+                return client_ip, sni
+            return None
+        if self.min_cols == 0:
+            return None
+        parts = line.split(self.sep, self.min_cols)
+        if len(parts) < self.min_cols:
+            return None
+        client_ip, sni = parts[self.ip_idx], parts[self.sni_idx]
+        if not client_ip or not sni or client_ip == self.unset or sni == self.unset:
+            return None
+        return client_ip, sni
+
+    def prime(self, path: Path) -> None:
+        """Load the header block at the top of ``path`` (used when resuming mid-file)."""
+        try:
+            with path.open("r", encoding="utf-8", errors="replace") as f:
+                for ln in f:
+                    if not ln.startswith("#"):
+                        break
+                    self._header(ln.rstrip("\n"))
+        except OSError:
+            pass
+
+_default_parser = ZeekSSLParser()
 
 def parse_zeek_ssl_tsv(line: str) -> Optional[Tuple[str, str]]:
-    if not line or line.startswith("#"):
-        return None
-    parts = line.split("\t")
-    try:
-        client_ip = parts[2]
-        sni = ""
-        for p in parts:
-            if "." in p and any(c.isalpha() for c in p) and 3 <= len(p) <= 253:
-                sni = p
-                break
-        if client_ip and sni:
-            return client_ip, sni
-    except Exception:
-        return None
-    return None
-
-def stream_zeek_sni_events(log_path: str):
+    return _default_parser.parse(line)
+
+def stream_zeek_sni_events(log_path: str, checkpoint_path: str | None = None):
     p = Path(log_path)
     if not p.exists():
         raise FileNotFoundError(f"Missing Zeek ssl.log: {p}")
-    for ln in tail_lines(p):
-        evt = parse_zeek_ssl_tsv(ln)
+    parser = ZeekSSLParser()
+    parser.prime(p)
+    parse_timer = STAGE_SECONDS.labels("parse_sni")
+    for ln in tail_lines(p, checkpoint_path=Path(checkpoint_path) if checkpoint_path else None):
+        t0 = time.perf_counter()
+        evt = parser.parse(ln)
+        parse_timer.observe(time.perf_counter() - t0)
         if evt:
             yield evt
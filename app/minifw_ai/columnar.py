@@ -0,0 +1,371 @@
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from pathlib import Path
+from typing import Callable, Iterator
+
+from .events import read_events_from
+from .segments import _event_epoch, segment_files
+
+# stdlib only (pyarrow optional): also imported by the web app as app.minifw_ai.columnar
+
+COLUMNAR_FORMATS = ("auto", "parquet", "mfwcol")
+COLUMNAR_MAGIC = b"MFWCOL1\n"
+EXPORT_MANIFEST = "export.json"
+DICT_COLUMNS = ("segment", "action", "reasons")
+# (name, type) in file order; dict = uint16 ids into the file's dictionary for that column
+SCHEMA = (
+    ("ts", "float64"),
+    ("segment", "dict"),
+    ("client_ip", "string"),
+    ("domain", "string"),
+    ("action", "dict"),
+    ("score", "int32"),
+    ("reasons", "list<dict>"),
+)
+_FOOTER = struct.Struct("<I")
+
+def export_dir(log_path: Path) -> Path:
+    """``logs/events.jsonl`` exports its closed segments to ``logs/events.jsonl.columnar/``
+    (full name, like ``segments_dir``)."""
+    p = Path(log_path)
+    return p.with_name(f"{p.name}.columnar")
+
+def _le(a: array) -> bytes:
+    if sys.byteorder != "little":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+def _from_le(typecode: str, b: bytes) -> array:
+    a = array(typecode)
+    a.frombytes(b)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+class _Dictionary:
+    def __init__(self):
+        self.strings: list[str] = []
+        self.ids: dict[str, int] = {}
+
+    def id_for(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            if len(self.strings) >= 0xFFFF:
+                raise ValueError("columnar dictionary is full")
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+class _RowGroup:
+    """Column buffers for up to ``row_group_size`` events."""
+
+    def __init__(self):
+        self.ts = array("d")
+        self.segment = array("H")
+        self.client_ip: list[str] = []
+        self.domain: list[str] = []
+        self.action = array("H")
+        self.score = array("i")
+        self.reason_counts = array("I")
+        self.reasons = array("H")
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def add(self, ev: dict, dicts: dict[str, _Dictionary]) -> None:
+        t = _event_epoch(ev)
+        self.ts.append(math.nan if t is None else t)
+        self.segment.append(dicts["segment"].id_for(str(ev.get("segment", ""))))
+        self.client_ip.append(str(ev.get("client_ip", "")))
+        self.domain.append(str(ev.get("domain", "")))
+        self.action.append(dicts["action"].id_for(str(ev.get("action", ""))))
+        try:
+            self.score.append(max(-2**31, min(2**31 - 1, int(ev.get("score", 0)))))
+        except (TypeError, ValueError):
+            self.score.append(0)
+        reasons = ev.get("reasons") or ()
+        self.reason_counts.append(len(reasons))
+        self.reasons.extend(dicts["reasons"].id_for(str(r)) for r in reasons)
+
+class _ColumnarFile:
+    """The stdlib ``mfwcol`` layout, Parquet-like in miniature.
+
+    ``MFWCOL1\\n``, then per row group one zlib-compressed chunk per
+    column, then a JSON footer (schema, dictionaries, chunk offsets and
+    buffer sizes), its uint32 length and the magic again. All numbers are
+    little-endian; strings are uint32 lengths followed by UTF-8 bytes.
+    """
+
+    suffix = ".mfwcol"
+
+    def __init__(self, path: Path):
+        self.f = path.open("wb")
+        self.f.write(COLUMNAR_MAGIC)
+        self.row_groups: list[dict] = []
+
+    @staticmethod
+    def _strings(values: list[str]) -> list[bytes]:
+        data = [s.encode("utf-8") for s in values]
+        return [_le(array("I", map(len, data))), b"".join(data)]
+
+    def write_group(self, g: _RowGroup, dicts: dict[str, _Dictionary]) -> None:
+        buffers = {
+            "ts": [_le(g.ts)],
+            "segment": [_le(g.segment)],
+            "client_ip": self._strings(g.client_ip),
+            "domain": self._strings(g.domain),
+            "action": [_le(g.action)],
+            "score": [_le(g.score)],
+            "reasons": [_le(g.reason_counts), _le(g.reasons)],
+        }
+        chunks = {}
+        for name, _ in SCHEMA:
+            data = zlib.compress(b"".join(buffers[name]), 6)
+            chunks[name] = [self.f.tell(), len(data), [len(b) for b in buffers[name]]]
+            self.f.write(data)
+        self.row_groups.append({"rows": len(g), "columns": chunks})
+
+    def close(self, dicts: dict[str, _Dictionary], meta: dict) -> None:
+        footer = json.dumps({
+            "version": 1,
+            "schema": [list(c) for c in SCHEMA],
+            "dictionaries": {name: d.strings for name, d in dicts.items()},
+            "row_groups": self.row_groups,
+            "rows": sum(rg["rows"] for rg in self.row_groups),
+            **meta,
+        }, ensure_ascii=False).encode("utf-8")
+        self.f.write(footer + _FOOTER.pack(len(footer)) + COLUMNAR_MAGIC)
+        self.f.close()
+
+    def abort(self) -> None:
+        self.f.close()
+
+class _ParquetFile:
+    """Parquet through pyarrow, with dictionary-typed segment/action/reasons columns."""
+
+    suffix = ".parquet"
+
+    def __init__(self, path: Path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.path = path
+        dict_type = pa.dictionary(pa.int32(), pa.string())
+        self.schema = pa.schema([
+            ("ts", pa.timestamp("us", tz="UTC")),
+            ("segment", dict_type),
+            ("client_ip", pa.string()),
+            ("domain", pa.string()),
+            ("action", dict_type),
+            ("score", pa.int32()),
+            ("reasons", pa.list_(dict_type)),
+        ])
+        self.writer = pq.ParquetWriter(str(path), self.schema)
+
+    def write_group(self, g: _RowGroup, dicts: dict[str, _Dictionary]) -> None:
+        pa = self.pa
+
+        def dictionary(ids: array, name: str):
+            return pa.DictionaryArray.from_arrays(pa.array(ids, pa.int32()),
+                                                  pa.array(dicts[name].strings, pa.string()))
+
+        offsets = [0]
+        for n in g.reason_counts:
+            offsets.append(offsets[-1] + n)
+        self.writer.write_table(pa.Table.from_arrays([
+            pa.array([None if math.isnan(t) else int(t * 1_000_000) for t in g.ts], pa.timestamp("us", tz="UTC")),
+            dictionary(g.segment, "segment"),
+            pa.array(g.client_ip, pa.string()),
+            pa.array(g.domain, pa.string()),
+            dictionary(g.action, "action"),
+            pa.array(g.score, pa.int32()),
+            pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), dictionary(g.reasons, "reasons")),
+        ], schema=self.schema))
+
+    def close(self, dicts: dict[str, _Dictionary], meta: dict) -> None:
+        self.writer.close()
+
+    def abort(self) -> None:
+        self.writer.close()
+
+def resolve_format(fmt: str = "auto") -> str:
+    """``auto`` picks Parquet when pyarrow is installed and ``mfwcol`` otherwise."""
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"format must be one of {COLUMNAR_FORMATS}, got {fmt!r}")
+    if fmt == "mfwcol":
+        return fmt
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        if fmt == "parquet":
+            raise ValueError("Parquet export needs the 'pyarrow' package")
+        return "mfwcol"
+    return "parquet"
+
+def export_segment(src: Path, dst: Path, fmt: str = "mfwcol", row_group_size: int = 65536,
+                   meta: dict | None = None) -> int:
+    """Convert one event log file into a columnar file, ``row_group_size``
+    events at a time; ``dst`` only appears once it is complete. Returns
+    the row count."""
+    cls = _ParquetFile if fmt == "parquet" else _ColumnarFile
+    # a run killed mid-file leaves only this, which the next run overwrites
+    tmp = dst.with_name(dst.name + ".tmp")
+    out = cls(tmp)
+    dicts = {name: _Dictionary() for name in DICT_COLUMNS}
+    rows = 0
+    try:
+        group = _RowGroup()
+        for ev, _ in read_events_from(src):
+            group.add(ev, dicts)
+            if len(group) >= row_group_size:
+                out.write_group(group, dicts)
+                rows += len(group)
+                group = _RowGroup()
+        if len(group) or not rows:
+            out.write_group(group, dicts)
+            rows += len(group)
+        out.close(dicts, meta or {})
+    except BaseException:
+        out.abort()
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, dst)
+    return rows
+
+def load_export_manifest(out_dir: Path) -> dict:
+    try:
+        with (Path(out_dir) / EXPORT_MANIFEST).open("r", encoding="utf-8") as f:
+            return dict(json.load(f).get("segments", {}))
+    except (OSError, ValueError):
+        return {}
+
+def _save_export_manifest(out_dir: Path, log_path: Path, done: dict) -> None:
+    path = Path(out_dir) / EXPORT_MANIFEST
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump({"log": Path(log_path).name, "segments": done}, f, indent=1)
+    os.replace(tmp, path)
+
+def export_segments(log_path: Path, out_dir: Path | None = None, fmt: str = "auto", row_group_size: int = 65536,
+                    on_segment: Callable[[str, int], None] | None = None) -> dict:
+    """Export every closed segment of ``log_path`` that is not exported yet.
+
+    Each segment becomes one file in ``out_dir`` (``<name>.columnar/`` by
+    default) and is recorded in its ``export.json`` as soon as it is
+    written, so an interrupted run resumes with the first unfinished
+    segment. The live log is left alone until it rotates.
+    """
+    fmt = resolve_format(fmt)
+    out_dir = Path(out_dir) if out_dir is not None else export_dir(log_path)
+    done = load_export_manifest(out_dir)
+    summary = {"format": fmt, "dir": str(out_dir), "exported": 0, "skipped": 0, "rows": 0}
+    for entry, src in segment_files(log_path):
+        seg_id = entry["id"]
+        prev = done.get(seg_id)
+        if prev is not None and (out_dir / prev["file"]).exists():
+            summary["skipped"] += 1
+            continue
+        suffix = _ParquetFile.suffix if fmt == "parquet" else _ColumnarFile.suffix
+        dst = out_dir / (Path(seg_id).stem + suffix)
+        meta = {"source": seg_id, "start": entry.get("start"), "end": entry.get("end")}
+        out_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            rows = export_segment(src, dst, fmt, row_group_size, meta)
+        except FileNotFoundError:
+            continue  # dropped by retention since we read the manifest
+        done[seg_id] = {"file": dst.name, "format": fmt, "rows": rows, "start": entry.get("start"),
+                        "end": entry.get("end"), "exported_at": time.time()}
+        _save_export_manifest(out_dir, log_path, done)
+        summary["exported"] += 1
+        summary["rows"] += rows
+        if on_segment is not None:
+            on_segment(seg_id, rows)
+    return summary
+
+def _read_footer(f) -> dict:
+    f.seek(-(_FOOTER.size + len(COLUMNAR_MAGIC)), os.SEEK_END)
+    tail = f.read(_FOOTER.size + len(COLUMNAR_MAGIC))
+    if tail[_FOOTER.size:] != COLUMNAR_MAGIC:
+        raise ValueError(f"{f.name} is not a complete MiniFW-AI columnar file")
+    (n,) = _FOOTER.unpack(tail[:_FOOTER.size])
+    f.seek(-(n + len(tail)), os.SEEK_END)
+    return json.loads(f.read(n))
+
+def read_footer(path: Path) -> dict:
+    """Schema, dictionaries, row groups and source metadata of an ``mfwcol`` file."""
+    with Path(path).open("rb") as f:
+        return _read_footer(f)
+
+def iter_row_groups(path: Path, columns: list[str] | None = None) -> Iterator[dict[str, list]]:
+    """``{column: values}`` per row group of an ``mfwcol`` file, reading only ``columns``.
+
+    ``ts`` is epoch seconds (NaN if the event had none), dictionary
+    columns come back as strings and ``reasons`` as lists of strings,
+    so each group drops straight into ``pandas.DataFrame``.
+    """
+    names = [c for c, _ in SCHEMA]
+    wanted = names if columns is None else [c for c in columns if c in names]
+    with Path(path).open("rb") as f:
+        footer = _read_footer(f)
+        dicts = footer["dictionaries"]
+        for rg in footer["row_groups"]:
+            out: dict[str, list] = {}
+            for name in wanted:
+                offset, length, sizes = rg["columns"][name]
+                f.seek(offset)
+                raw = zlib.decompress(f.read(length))
+                bufs, pos = [], 0
+                for size in sizes:
+                    bufs.append(raw[pos:pos + size])
+                    pos += size
+                if name == "ts":
+                    out[name] = _from_le("d", bufs[0]).tolist()
+                elif name == "score":
+                    out[name] = _from_le("i", bufs[0]).tolist()
+                elif name in ("segment", "action"):
+                    strings = dicts[name]
+                    out[name] = [strings[i] for i in _from_le("H", bufs[0])]
+                elif name == "reasons":
+                    strings = dicts[name]
+                    ids = _from_le("H", bufs[1])
+                    lists, k = [], 0
+                    for n in _from_le("I", bufs[0]):
+                        lists.append([strings[i] for i in ids[k:k + n]])
+                        k += n
+                    out[name] = lists
+                else:
+                    data, values, k = bufs[1], [], 0
+                    for n in _from_le("I", bufs[0]):
+                        values.append(data[k:k + n].decode("utf-8"))
+                        k += n
+                    out[name] = values
+            yield out
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m minifw_ai export-columnar",
+                                 description="Export closed event log segments to a columnar format.")
+    ap.add_argument("logs", nargs="+", help="live event log(s), e.g. /opt/minifw_ai/logs/events.jsonl")
+    ap.add_argument("-o", "--out-dir", help="output directory (default: <log name>.columnar next to the log)")
+    ap.add_argument("--format", choices=COLUMNAR_FORMATS, default="auto",
+                    help="parquet needs pyarrow; auto falls back to mfwcol without it")
+    ap.add_argument("--row-group-size", type=int, default=65536, help="events per row group")
+    args = ap.parse_args(argv)
+    for log in args.logs:
+        try:
+            s = export_segments(Path(log), Path(args.out_dir) if args.out_dir else None, args.format,
+                                args.row_group_size,
+                                on_segment=lambda seg_id, rows: print(f"{seg_id}: {rows:,} rows"))
+        except ValueError as e:
+            ap.error(str(e))
+        print(f"{log}: exported {s['exported']} segment(s), {s['rows']:,} rows as {s['format']} to {s['dir']} "
+              f"({s['skipped']} already done)")
+    return 0
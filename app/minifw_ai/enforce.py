@@ -1,11 +1,22 @@
 from __future__ import annotations
+import re
 import subprocess
+import threading
+import time
+
+from minifw_ai.metrics import ENFORCE_FLUSH_SECONDS
+
+BATCH_MODES = ("ipset", "nft", "off")
 
 def ipset_create(set_name: str, timeout: int) -> None:
     subprocess.run(["ipset", "create", set_name, "hash:ip", "timeout", str(timeout), "-exist"], check=False)
 
-def ipset_add(set_name: str, ip: str, timeout: int) -> None:
-    subprocess.run(["ipset", "add", set_name, ip, "timeout", str(timeout), "-exist"], check=False)
+def ipset_add(set_name: str, ip: str, timeout: int) -> bool:
+    try:
+        r = subprocess.run(["ipset", "add", set_name, ip, "timeout", str(timeout), "-exist"], check=False)
+    except OSError:
+        return False
+    return r.returncode == 0
 
 def nft_apply_forward_drop(set_name: str, table: str = "inet", chain: str = "forward") -> None:
     subprocess.run(["nft", "add", "table", table, "filter"], check=False)
@@ -21,3 +32,251 @@ def nft_apply_forward_drop(set_name: str, table: str = "inet", chain: str = "for
             "ip", "saddr", f"@{set_name}", "drop",
             "comment", "MiniFW-AI blocklist"
         ], check=False)
+
+def ipset_list_members(set_name: str) -> dict[str, int]:
+    """Return ``{ip: remaining_timeout_seconds}`` for the members of an ipset."""
+    try:
+        out = subprocess.run(["ipset", "list", set_name], capture_output=True, text=True, check=False).stdout
+    except OSError:
+        return {}
+    members: dict[str, int] = {}
+    in_members = False
+    for ln in out.splitlines():
+        if not in_members:
+            in_members = ln.startswith("Members:")
+            continue
+        parts = ln.split()
+        if not parts:
+            continue
+        remaining = 0
+        if "timeout" in parts:
+            try:
+                remaining = int(parts[parts.index("timeout") + 1])
+            except (IndexError, ValueError):
+                remaining = 0
+        members[parts[0]] = remaining
+    return members
+
+def ipset_restore(lines: list[str]) -> bool:
+    try:
+        r = subprocess.run(["ipset", "restore", "-exist"], input="\n".join(lines) + "\n", text=True, check=False)
+    except OSError:
+        return False
+    return r.returncode == 0
+
+def nft_run_script(script: str) -> bool:
+    try:
+        r = subprocess.run(["nft", "-f", "-"], input=script, text=True, check=False)
+    except OSError:
+        return False
+    return r.returncode == 0
+
+def nft_create_set(set_name: str, timeout: int, table: str = "inet") -> None:
+    """Native nft set for ``batch_mode: "nft"`` (the ipset counterpart of ``ipset_create``)."""
+    subprocess.run(["nft", "add", "table", table, "filter"], check=False)
+    subprocess.run([
+        "nft", "add", "set", table, "filter", set_name,
+        "{", "type", "ipv4_addr", ";", "flags", "timeout", ";", "timeout", f"{timeout}s", ";", "}"
+    ], check=False)
+
+def nft_add_element(set_name: str, ip: str, timeout: int, table: str = "inet") -> bool:
+    try:
+        r = subprocess.run(["nft", "add", "element", table, "filter", set_name,
+                            "{", ip, "timeout", f"{timeout}s", "}"], check=False)
+    except OSError:
+        return False
+    return r.returncode == 0
+
+_NFT_DURATION = re.compile(r"(\d+)(ms|d|h|m|s)")
+_NFT_UNITS = {"d": 86400, "h": 3600, "m": 60, "s": 1, "ms": 0.001}
+
+def nft_list_members(set_name: str, table: str = "inet") -> dict[str, int]:
+    """Return ``{ip: remaining_timeout_seconds}`` for the elements of an nft set."""
+    try:
+        out = subprocess.run(["nft", "list", "set", table, "filter", set_name], capture_output=True, text=True,
+                             check=False).stdout
+    except OSError:
+        return {}
+    start = out.find("elements = {")
+    if start < 0:
+        return {}
+    body = out[start + len("elements = {"):out.find("}", start)]
+    members: dict[str, int] = {}
+    for item in body.replace("\n", " ").split(","):
+        parts = item.split()
+        if not parts:
+            continue
+        remaining = 0
+        if "expires" in parts:
+            i = parts.index("expires") + 1
+            if i < len(parts):
+                remaining = int(sum(int(n) * _NFT_UNITS[u] for n, u in _NFT_DURATION.findall(parts[i])))
+        members[parts[0]] = remaining
+    return members
+
+class BlockMirror:
+    """In-engine copy of what is already in the kernel blocklist.
+
+    Tracks the expiry of every IP we have pushed so repeat block decisions
+    can be dropped until the remaining TTL falls below
+    ``renew_fraction * timeout``; only then is the entry renewed. An
+    expiry is only recorded (``mark``) once the push succeeded, so a
+    failed push is retried on the next decision.
+    """
+
+    def __init__(self, timeout: int, renew_fraction: float = 0.25):
+        self.timeout = timeout
+        self.renew_fraction = min(max(renew_fraction, 0.0), 1.0)
+        self._expiry: dict[str, float] = {}
+
+    def load(self, members: dict[str, int]) -> None:
+        now = time.time()
+        for ip, remaining in members.items():
+            # members without a per-entry timeout never expire in the kernel
+            self._expiry[ip] = now + remaining if remaining > 0 else float("inf")
+
+    def needs_push(self, ip: str, timeout: int | None = None) -> bool:
+        timeout = self.timeout if timeout is None else timeout
+        now = time.time()
+        exp = self._expiry.get(ip)
+        return exp is None or (exp - now) <= timeout * self.renew_fraction
+
+    def mark(self, ip: str, timeout: int | None = None) -> None:
+        self._expiry[ip] = time.time() + (self.timeout if timeout is None else timeout)
+
+    def prune(self) -> None:
+        now = time.time()
+        for ip in [ip for ip, exp in self._expiry.items() if exp <= now]:
+            del self._expiry[ip]
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+class BatchEnforcer:
+    """Collects block decisions and applies them in one kernel transaction.
+
+    Pending IPs are flushed through ``ipset restore`` (or ``nft -f -``) once
+    ``batch_max_entries`` are queued or ``batch_flush_ms`` have passed,
+    whichever comes first. ``batch_mode: "off"`` keeps the old one
+    ``ipset add`` per decision, and a failed batch is retried one IP at a
+    time through the same backend (``ipset add`` / ``nft add element``).
+    IPs that are still blocked with enough TTL left are skipped entirely
+    (see ``BlockMirror``).
+    """
+
+    def __init__(self, set_name: str, timeout: int, mode: str = "ipset", flush_ms: int = 200,
+                 max_entries: int = 256, nft_table: str = "inet", renew_fraction: float = 0.25):
+        if mode not in BATCH_MODES:
+            raise ValueError(f"batch_mode must be one of {BATCH_MODES}, got {mode!r}")
+        self.set_name = set_name
+        self.timeout = timeout
+        self.mode = mode
+        self.flush_interval = max(flush_ms, 1) / 1000.0
+        self.max_entries = max(max_entries, 1)
+        self.nft_table = nft_table
+        self._pending: dict[str, int] = {}
+        self.requested = 0
+        self.skipped = 0
+        self.pushed = 0
+        self.batches = 0
+        self.fallbacks = 0
+        self.failed = 0
+        self._flush_timer = ENFORCE_FLUSH_SECONDS.labels(mode)
+        self.mirror = BlockMirror(timeout, renew_fraction)
+        self.mirror.load(nft_list_members(set_name, nft_table) if mode == "nft" else ipset_list_members(set_name))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="minifw-enforce", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_policy(cls, enf: dict) -> "BatchEnforcer":
+        return cls(
+            set_name=enf.get("ipset_name_v4", "minifw_block_v4"),
+            timeout=int(enf.get("ip_timeout_seconds", 86400)),
+            mode=str(enf.get("batch_mode", "ipset")),
+            flush_ms=int(enf.get("batch_flush_ms", 200)),
+            max_entries=int(enf.get("batch_max_entries", 256)),
+            nft_table=enf.get("nft_table", "inet"),
+            renew_fraction=float(enf.get("renew_below_fraction", 0.25)),
+        )
+
+    def add(self, ip: str, timeout: int | None = None) -> None:
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            self.requested += 1
+            if not self.mirror.needs_push(ip, timeout):
+                self.skipped += 1
+                return
+        if self.mode == "off":
+            t0 = time.perf_counter()
+            ok = ipset_add(self.set_name, ip, timeout)
+            self._flush_timer.observe(time.perf_counter() - t0)
+            with self._lock:
+                if ok:
+                    self.mirror.mark(ip, timeout)
+                    self.pushed += 1
+                else:
+                    self.failed += 1
+            return
+        with self._lock:
+            self._pending[ip] = timeout
+            full = len(self._pending) >= self.max_entries
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        t0 = time.perf_counter()
+        if self.mode == "nft":
+            elems = ", ".join(f"{ip} timeout {t}s" for ip, t in batch.items())
+            ok = nft_run_script(f"add element {self.nft_table} filter {self.set_name} {{ {elems} }}\n")
+        else:
+            ok = ipset_restore([f"add {self.set_name} {ip} timeout {t}" for ip, t in batch.items()])
+        done = batch
+        if not ok:
+            self.fallbacks += 1
+            done = {ip: t for ip, t in batch.items() if self._add_one(ip, t)}
+        self._flush_timer.observe(time.perf_counter() - t0)
+        with self._lock:
+            # only what reached the kernel counts as blocked; the rest is retried on its next decision
+            for ip, t in done.items():
+                self.mirror.mark(ip, t)
+            self.batches += 1
+            self.pushed += len(done)
+            self.failed += len(batch) - len(done)
+
+    def _add_one(self, ip: str, timeout: int) -> bool:
+        if self.mode == "nft":
+            return nft_add_element(self.set_name, ip, timeout, self.nft_table)
+        return ipset_add(self.set_name, ip, timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requested": self.requested,
+                "skipped_still_blocked": self.skipped,
+                "pushed": self.pushed,
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "batch_fallbacks": self.fallbacks,
+                "failed": self.failed,
+                "mirror_size": len(self.mirror),
+            }
+
+    def _flush_loop(self) -> None:
+        last_prune = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() - last_prune >= 60:
+                with self._lock:
+                    self.mirror.prune()
+                last_prune = time.monotonic()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.flush()
@@ -0,0 +1,568 @@
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable
+
+from .events import open_log, read_events_from
+from .segments import load_manifest, segment_path
+
+# stdlib only: this module is also imported by the web app as app.minifw_ai.event_store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id        INTEGER PRIMARY KEY,
+    ts        TEXT NOT NULL,
+    segment   TEXT NOT NULL,
+    client_ip TEXT NOT NULL,
+    domain    TEXT NOT NULL,
+    action    TEXT NOT NULL,
+    score     INTEGER NOT NULL,
+    reasons   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events(ts);
+CREATE INDEX IF NOT EXISTS events_client_ip ON events(client_ip);
+DROP INDEX IF EXISTS events_domain;
+CREATE INDEX IF NOT EXISTS events_domain_ip ON events(domain, client_ip);
+DROP INDEX IF EXISTS events_action;
+CREATE INDEX IF NOT EXISTS events_action_reasons ON events(action, reasons);
+CREATE INDEX IF NOT EXISTS events_segment ON events(segment);
+CREATE TABLE IF NOT EXISTS ingest_offsets (
+    path   TEXT PRIMARY KEY,
+    inode  INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_minutes (
+    minute  INTEGER PRIMARY KEY,
+    allowed INTEGER NOT NULL,
+    blocked INTEGER NOT NULL,
+    threats INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_totals (
+    id      INTEGER PRIMARY KEY CHECK (id = 0),
+    allowed INTEGER NOT NULL,
+    blocked INTEGER NOT NULL,
+    threats INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_rollups (
+    res     INTEGER NOT NULL,
+    bucket  INTEGER NOT NULL,
+    segment TEXT NOT NULL,
+    action  TEXT NOT NULL,
+    reason  TEXT NOT NULL,
+    count   INTEGER NOT NULL,
+    PRIMARY KEY (res, bucket, segment, action, reason)
+) WITHOUT ROWID;
+"""
+
+# Rollup resolutions in seconds. Rows with reason '' count events; rows
+# with a reason count how often it was given (an event may carry several).
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)
+# How long each resolution is kept (seconds, None = forever)
+ROLLUP_RETENTION = {60: 14 * 86400, 3600: 400 * 86400, 86400: None}
+ROLLUP_GROUPS = ("action", "segment", "reason")
+
+_BACKFILL_ROLLUPS = """
+INSERT INTO event_rollups (res, bucket, segment, action, reason, count)
+SELECT :res, b, segment, action, reason, COUNT(*) FROM (
+    SELECT COALESCE(CAST(strftime('%s', ts) AS INTEGER) / :res * :res, 0) AS b, segment, action, '' AS reason
+    FROM events
+    UNION ALL
+    SELECT COALESCE(CAST(strftime('%s', ts) AS INTEGER) / :res * :res, 0), segment, action, j.value
+    FROM events, json_each(events.reasons) AS j
+) GROUP BY b, segment, action, reason
+"""
+
+# Trigram index for substring search; kept in step with events by triggers.
+# Needs SQLite >= 3.34 built with FTS5; without it search falls back to LIKE.
+# Reasons stay out of it: they come from a handful of names, which
+# reasons_condition finds in the rollups, and indexing them slowed ingest.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS events_search USING fts5(
+    domain, client_ip, content='events', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS events_search_ins AFTER INSERT ON events BEGIN
+    INSERT INTO events_search (rowid, domain, client_ip) VALUES (new.id, new.domain, new.client_ip);
+END;
+CREATE TRIGGER IF NOT EXISTS events_search_del AFTER DELETE ON events BEGIN
+    INSERT INTO events_search (events_search, rowid, domain, client_ip)
+    VALUES ('delete', old.id, old.domain, old.client_ip);
+END;
+"""
+
+# Same allowed/blocked/threat rules as the dashboard's _format_event, in SQL
+_BACKFILL_MINUTES = """
+INSERT INTO event_minutes (minute, allowed, blocked, threats)
+SELECT COALESCE(CAST(strftime('%s', ts) AS INTEGER) / 60, 0) AS m,
+       SUM(action = 'allow'), SUM(action != 'allow'),
+       SUM(score > 0 OR action != 'allow' OR reasons != '[]')
+FROM events GROUP BY m
+"""
+
+COLUMNS = ("ts", "segment", "client_ip", "domain", "action", "score", "reasons")
+
+def _row(ev: dict) -> tuple:
+    return (
+        str(ev.get("ts", "")),
+        str(ev.get("segment", "default")),
+        str(ev.get("client_ip", "")),
+        str(ev.get("domain", "")),
+        str(ev.get("action", "unknown")),
+        int(ev.get("score", 0) or 0),
+        json.dumps(ev.get("reasons") or [], ensure_ascii=False),
+    )
+
+def _like_pattern(text: str) -> str:
+    """``%text%`` with LIKE wildcards escaped (use with ``ESCAPE '\\'``)."""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def event_minute(ts: str) -> int:
+    """Epoch minute of an event timestamp; 0 (counted, but in no window) if unparseable."""
+    try:
+        return int(datetime.fromisoformat(ts).timestamp()) // 60
+    except (TypeError, ValueError):
+        return 0
+
+def classify(ev: dict) -> tuple[int, int, int]:
+    """``(allowed, blocked, threat)`` flags of one event, as the dashboard counts them."""
+    action = ev.get("action", "unknown")
+    allowed = action == "allow"
+    threat = (ev.get("score", 0) or 0) > 0 or not allowed or bool(ev.get("reasons"))
+    return int(allowed), int(not allowed), int(threat)
+
+def _add_rollups(rollups: dict, minute: int, segment: str, action: str, reasons) -> None:
+    buckets = [(res, minute * 60 // res * res) for res in ROLLUP_RESOLUTIONS]
+    for reason in ("", *(str(r) for r in reasons)):
+        for res, bucket in buckets:
+            key = (res, bucket, segment, action, reason)
+            rollups[key] = rollups.get(key, 0) + 1
+
+def pick_resolution(span_seconds: float, max_points: int = 1000) -> int:
+    """Finest rollup resolution that keeps a chart of ``span_seconds`` under ``max_points``."""
+    for res in ROLLUP_RESOLUTIONS:
+        if span_seconds / res <= max_points:
+            return res
+    return ROLLUP_RESOLUTIONS[-1]
+
+def row_to_event(row: sqlite3.Row | tuple) -> dict:
+    """Back to the raw event dict shape written by the engine."""
+    ev = dict(zip(COLUMNS, tuple(row)[-len(COLUMNS):]))
+    try:
+        ev["reasons"] = json.loads(ev["reasons"])
+    except (TypeError, ValueError):
+        ev["reasons"] = []
+    return ev
+
+class _Moved(Exception):
+    """Another process advanced the ingest position first."""
+
+class EventStore:
+    """SQLite (WAL) copy of the event logs, indexed for the admin views.
+
+    The engine keeps writing its append-only logs; ``sync`` tails them from
+    the byte offsets recorded in ``ingest_offsets`` and inserts new events in
+    the same transaction that advances the offset, so several readers
+    (uvicorn workers) can call it concurrently without double-ingesting. A
+    log whose inode changes or that shrinks is re-read from the start;
+    rotated segments (see ``segments``) are followed through the manifest,
+    so nothing written between two syncs is lost to a rotation.
+
+    The same transaction also bumps per-minute allowed/blocked/threat
+    buckets and an all-time totals row, so dashboard counters never need
+    to touch the events table, adds to the minute/hour/day rollups by
+    segment, action and reason behind ``series``, and feeds the
+    ``events_search`` trigram index used by ``search_condition``.
+
+    Once an hour rows older than anything the logs still hold are pruned,
+    so the store follows the logs' segment retention instead of keeping a
+    full copy forever; counters and rollups are kept (rollups have their
+    own ``ROLLUP_RETENTION``).
+    """
+
+    def __init__(self, db_path: str | Path, batch_size: int = 5000, min_sync_interval: float = 1.0):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.min_sync_interval = min_sync_interval
+        self._local = threading.local()
+        self._last_sync = 0.0
+        self._last_prune = 0.0
+        self.ingested = 0
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn.executescript(SCHEMA)
+        self._backfill_counters()
+        self.has_search = self._init_search()
+
+    def _init_search(self) -> bool:
+        conn = self.conn
+        existed = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'events_search'").fetchone()
+        if existed is not None and "reasons" in existed[0]:
+            # older index that also covered reasons: recreate and rebuild it
+            conn.executescript("DROP TRIGGER IF EXISTS events_search_ins; DROP TRIGGER IF EXISTS events_search_del; "
+                               "DROP TABLE events_search;")
+            existed = None
+        try:
+            conn.executescript(SEARCH_SCHEMA)
+        except sqlite3.OperationalError as e:
+            print(f"[minifw] event store: no trigram search index ({e}), using LIKE scans")
+            return False
+        if not existed and conn.execute("SELECT 1 FROM events LIMIT 1").fetchone() is not None:
+            conn.execute("INSERT INTO events_search (events_search) VALUES ('rebuild')")
+        return True
+
+    def _backfill_counters(self) -> None:
+        """Databases created before the counter/rollup tables existed get them filled once."""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM event_totals").fetchone() is None:
+                conn.execute("DELETE FROM event_minutes")
+                conn.execute(_BACKFILL_MINUTES)
+                conn.execute("INSERT INTO event_totals (id, allowed, blocked, threats) "
+                             "SELECT 0, COALESCE(SUM(allowed), 0), COALESCE(SUM(blocked), 0), "
+                             "COALESCE(SUM(threats), 0) FROM event_minutes")
+            if conn.execute("SELECT 1 FROM event_rollups LIMIT 1").fetchone() is None:
+                for res in ROLLUP_RESOLUTIONS:
+                    conn.execute(_BACKFILL_ROLLUPS, {"res": res})
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def sync(self, files: Iterable[Path], force: bool = False) -> int:
+        """Ingest whatever was appended to ``files`` since the last call."""
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.min_sync_interval:
+            return 0
+        self._last_sync = now
+        files = [Path(p) for p in files]
+        n = 0
+        for path in files:
+            try:
+                n += self._sync_file(Path(path))
+            except _Moved:
+                continue
+            except (OSError, ValueError) as e:
+                print(f"[minifw] event store: skipping {path}: {e}")
+        self.ingested += n
+        if now - self._last_prune >= 3600:
+            self._last_prune = now
+            self.prune_rollups()
+            self.prune_events(files)
+        return n
+
+    @staticmethod
+    def retained_since(files: Iterable[Path]) -> float | None:
+        """Epoch seconds of the oldest event any of ``files`` still holds, in
+        its oldest retained segment or, if never rotated, the live file.
+        None if that cannot be told, which disables pruning."""
+        oldest = None
+        for path in files:
+            segments = load_manifest(path)
+            if segments:
+                t = segments[0].get("start")
+            else:
+                try:
+                    first = next(read_events_from(path), None)
+                except (OSError, ValueError):
+                    return None
+                if first is None:
+                    continue  # empty, holds nothing
+                try:
+                    t = datetime.fromisoformat(str(first[0].get("ts", ""))).timestamp()
+                except ValueError:
+                    return None
+            if t is None:
+                return None
+            oldest = t if oldest is None else min(oldest, t)
+        return oldest
+
+    def prune_events(self, files: Iterable[Path], chunk: int = 10000) -> int:
+        """Delete events older than what ``files`` still retain (see ``retained_since``);
+        the search index follows through its delete trigger."""
+        since = self.retained_since(files)
+        if since is None:
+            return 0
+        # segment ranges are writer clock times; leave a margin for event ts skew
+        cutoff = datetime.fromtimestamp(since - 60, timezone.utc).isoformat()
+        n = 0
+        while True:
+            # chunked so ingesting readers are never locked out for long
+            deleted = self.conn.execute("DELETE FROM events WHERE id IN "
+                                        "(SELECT id FROM events WHERE ts < ? LIMIT ?)", (cutoff, chunk)).rowcount
+            n += deleted
+            if deleted < chunk:
+                return n
+
+    def prune_rollups(self, now: float | None = None) -> int:
+        """Drop rollup buckets older than ``ROLLUP_RETENTION`` for their resolution."""
+        now = time.time() if now is None else now
+        n = 0
+        for res, keep in ROLLUP_RETENTION.items():
+            if keep is not None:
+                n += self.conn.execute("DELETE FROM event_rollups WHERE res = ? AND bucket < ?",
+                                       (res, int(now - keep))).rowcount
+        return n
+
+    def _offset_row(self, key: str):
+        return self.conn.execute("SELECT inode, offset FROM ingest_offsets WHERE path = ?", (key,)).fetchone()
+
+    def _sync_file(self, path: Path) -> int:
+        # Positions are logical offsets into the log's whole history: closed
+        # segments cover [offset, offset + raw_bytes) per the manifest and the
+        # live file starts where the last one ends. That keeps rotation (and
+        # inode reuse after compression) out of the bookkeeping.
+        for _ in range(3):
+            segments = load_manifest(path)
+            try:
+                live = open_log(path)
+            except FileNotFoundError:
+                continue  # renamed away, not reopened yet
+            if load_manifest(path) == segments:
+                break
+            live.close()
+        else:
+            return 0  # rotating right now; try again next sync
+        with live:
+            st = os.fstat(live.fileno())
+            live_start = segments[-1]["offset"] + segments[-1]["raw_bytes"] if segments else 0
+            key = str(path.resolve())
+            row = self._offset_row(key)
+            pos = row["offset"] if row is not None else 0
+            if row is not None and pos >= live_start and (row["inode"] != st.st_ino or pos - live_start > st.st_size):
+                # replaced or truncated by something other than our rotation
+                pos = live_start
+            if segments:
+                # anything before the oldest retained segment is gone
+                pos = max(pos, segments[0]["offset"])
+            total = 0
+            for entry in segments:
+                if pos >= entry["offset"] + entry["raw_bytes"]:
+                    continue
+                n, pos, row = self._ingest(key, segment_path(path, entry), entry["offset"], pos, st.st_ino, row)
+                total += n
+            if row is not None and row["inode"] == st.st_ino and row["offset"] == pos == live_start + st.st_size:
+                return total
+
+            def still_live() -> bool:
+                # the binary string table is looked up by name, so a batch
+                # read across a rotation is thrown away and read again
+                try:
+                    return os.stat(path).st_ino == st.st_ino and load_manifest(path) == segments
+                except FileNotFoundError:
+                    return False
+
+            n, pos, row = self._ingest(key, path, live_start, pos, st.st_ino, row, live, still_live)
+            return total + n
+
+    def _ingest(self, key: str, path: Path, base: int, pos: int, inode: int, expect, f=None,
+                still_live=None) -> tuple:
+        """Read ``path`` (which starts at logical offset ``base``) from ``pos`` on,
+        committing rows together with the new position batch by batch.
+
+        ``expect`` is the ``ingest_offsets`` row the position was derived
+        from (None if there was none); if another process moved it meanwhile
+        we back off instead of inserting the same events twice. ``f`` is an
+        already open ``path``; ``still_live`` is checked before each commit
+        and backs off the same way once it returns False. Returns
+        ``(rows, position, row)``.
+        """
+        conn = self.conn
+        total = 0
+        it = read_events_from(path, pos - base, f)
+        while True:
+            batch: list[tuple] = []
+            minutes: dict[int, list[int]] = {}
+            rollups: dict[tuple, int] = {}
+            end = pos - base
+            for ev, end in it:
+                rec = _row(ev)
+                batch.append(rec)
+                m = event_minute(rec[0])
+                flags = classify(ev)
+                acc = minutes.get(m)
+                if acc is None:
+                    minutes[m] = list(flags)
+                else:
+                    acc[0] += flags[0]
+                    acc[1] += flags[1]
+                    acc[2] += flags[2]
+                _add_rollups(rollups, m, rec[1], rec[4], ev.get("reasons") or ())
+                if len(batch) >= self.batch_size:
+                    break
+            new_pos = base + end
+            if not batch and expect is not None and (expect["inode"], expect["offset"]) == (inode, new_pos):
+                return total, new_pos, expect
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._offset_row(key)
+                seen = (cur["inode"], cur["offset"]) if cur is not None else None
+                if seen != ((expect["inode"], expect["offset"]) if expect is not None else None):
+                    raise _Moved()
+                if still_live is not None and not still_live():
+                    raise _Moved()
+                conn.executemany(f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                self._bump_counters(minutes)
+                conn.executemany(
+                    "INSERT INTO event_rollups (res, bucket, segment, action, reason, count) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(res, bucket, segment, action, reason) "
+                    "DO UPDATE SET count = count + excluded.count",
+                    [(*k, v) for k, v in rollups.items()],
+                )
+                conn.execute("INSERT OR REPLACE INTO ingest_offsets (path, inode, offset) VALUES (?, ?, ?)",
+                             (key, inode, new_pos))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            total += len(batch)
+            pos = new_pos
+            expect = {"inode": inode, "offset": new_pos}
+            if len(batch) < self.batch_size:
+                return total, pos, expect
+
+    def _bump_counters(self, minutes: dict[int, list[int]]) -> None:
+        conn = self.conn
+        conn.executemany(
+            "INSERT INTO event_minutes (minute, allowed, blocked, threats) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(minute) DO UPDATE SET allowed = allowed + excluded.allowed, "
+            "blocked = blocked + excluded.blocked, threats = threats + excluded.threats",
+            [(m, *v) for m, v in minutes.items()],
+        )
+        a = sum(v[0] for v in minutes.values())
+        b = sum(v[1] for v in minutes.values())
+        t = sum(v[2] for v in minutes.values())
+        conn.execute("UPDATE event_totals SET allowed = allowed + ?, blocked = blocked + ?, "
+                     "threats = threats + ? WHERE id = 0", (a, b, t))
+
+    def counters(self, since_minute: int | None = None) -> dict:
+        """All-time totals (one row) or totals since an epoch minute (one row per minute)."""
+        if since_minute is None:
+            row = self.conn.execute("SELECT allowed, blocked, threats FROM event_totals WHERE id = 0").fetchone()
+        else:
+            row = self.conn.execute("SELECT COALESCE(SUM(allowed), 0), COALESCE(SUM(blocked), 0), "
+                                    "COALESCE(SUM(threats), 0) FROM event_minutes WHERE minute >= ?",
+                                    (since_minute,)).fetchone()
+        allowed, blocked, threats = tuple(row) if row is not None else (0, 0, 0)
+        return {"total_allowed": allowed, "total_blocked": blocked, "threats_detected": threats}
+
+    def series(self, start: int, end: int, res: int | None = None, group_by: str = "action",
+               segment: str | None = None, action: str | None = None) -> dict:
+        """Event counts per bucket in ``[start, end)`` epoch seconds, one series per group.
+
+        Reads only the rollup tables, so weeks of history cost a few
+        thousand rows at most. ``group_by="reason"`` counts reason
+        occurrences; the other groupings count events.
+        """
+        if group_by not in ROLLUP_GROUPS:
+            raise ValueError(f"group_by must be one of {ROLLUP_GROUPS}, got {group_by!r}")
+        res = res or pick_resolution(end - start)
+        if res not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {ROLLUP_RESOLUTIONS}, got {res!r}")
+        first = start // res * res
+        conds = ["res = ?", "bucket >= ?", "bucket < ?", "reason != ''" if group_by == "reason" else "reason = ''"]
+        params: list = [res, first, end]
+        if segment is not None:
+            conds.append("segment = ?")
+            params.append(segment)
+        if action is not None:
+            conds.append("action = ?")
+            params.append(action)
+        rows = self.conn.execute(
+            f"SELECT bucket, {group_by}, SUM(count) FROM event_rollups WHERE {' AND '.join(conds)} "
+            f"GROUP BY bucket, {group_by}", params,
+        ).fetchall()
+        buckets = list(range(first, end, res))
+        index = {b: i for i, b in enumerate(buckets)}
+        series: dict[str, list[int]] = {}
+        for bucket, key, n in rows:
+            series.setdefault(key, [0] * len(buckets))[index[bucket]] = n
+        return {"resolution": res, "buckets": buckets, "series": series}
+
+    def search_condition(self, text: str) -> tuple[str, tuple]:
+        """SQL condition for events whose domain or client_ip contain ``text``.
+
+        Uses the trigram index for terms of three or more characters; the
+        index answers both the page and the COUNT without scanning events.
+        """
+        text = text.strip()
+        if self.has_search and len(text) >= 3:
+            return ("id IN (SELECT rowid FROM events_search WHERE events_search MATCH ?)",
+                    ('"' + text.replace('"', '""') + '"',))
+        like = _like_pattern(text)
+        return "(domain LIKE ? ESCAPE '\\' OR client_ip LIKE ? ESCAPE '\\')", (like, like)
+
+    def reasons_condition(self, text: str) -> tuple[str, tuple]:
+        """SQL condition for events carrying a reason that contains ``text``.
+
+        The reason names seen so far are looked up in the daily rollups, a
+        few rows; ``""`` when none matches, so an ordinary domain or IP
+        search adds no scan of the reasons column.
+        """
+        text = text.strip().lower()
+        if not text:
+            return "", ()
+        names = [r for (r,) in self.conn.execute(
+            "SELECT DISTINCT reason FROM event_rollups WHERE res = ? AND reason != '' AND instr(lower(reason), ?)",
+            (ROLLUP_RESOLUTIONS[-1], text))]
+        if not names:
+            return "", ()
+        likes = tuple(_like_pattern(json.dumps(r, ensure_ascii=False)) for r in names)
+        return "(" + " OR ".join(["reasons LIKE ? ESCAPE '\\'"] * len(likes)) + ")", likes
+
+    def count(self, where: str = "", params: tuple = ()) -> int:
+        """Rows matching the SQL condition ``where`` (all rows if empty)."""
+        sql = "SELECT COUNT(*) FROM events" + (f" WHERE {where}" if where else "")
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def page(self, where: str = "", params: tuple = (), order: tuple = ("ts",), descending: bool = True,
+             limit: int = 100, offset: int = 0, after: tuple | None = None) -> tuple[list[dict], tuple | None]:
+        """One page of raw events plus the keyset of its last row.
+
+        ``order`` are column names; ``id`` is appended as the tie-breaker.
+        Passing a previous page's key as ``after`` continues right behind it
+        through the index instead of skipping ``offset`` rows, so deep pages
+        cost the same as the first one.
+        """
+        cols = (*order, "id")
+        direction = "DESC" if descending else "ASC"
+        conds = [f"({where})"] if where else []
+        if after is not None:
+            if len(after) != len(cols):
+                raise ValueError("cursor does not match the sort order")
+            conds.append(f"({', '.join(cols)}) {'<' if descending else '>'} ({', '.join('?' * len(cols))})")
+            params = (*params, *after)
+            offset = 0
+        sql = (f"SELECT id, {', '.join(COLUMNS)} FROM events"
+               + (f" WHERE {' AND '.join(conds)}" if conds else "")
+               + f" ORDER BY {', '.join(f'{c} {direction}' for c in cols)} LIMIT ? OFFSET ?")
+        rows = self.conn.execute(sql, (*params, limit, offset)).fetchall()
+        last = tuple(rows[-1][c] for c in cols) if rows else None
+        return [row_to_event(r) for r in rows], last
+
+    def query(self, where: str = "", params: tuple = (), order: tuple = ("ts",), descending: bool = True,
+              limit: int = 100, offset: int = 0) -> list[dict]:
+        return self.page(where, params, order, descending, limit, offset)[0]
+
+    def stats(self) -> dict:
+        return {"ingested": self.ingested, "rows": self.count()}
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -1,8 +1,30 @@
 from __future__ import annotations
+import argparse
+import gzip
+import io
 import json
-from dataclasses import dataclass, asdict
+import os
+import sys
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterator
+
+DURABILITY_MODES = ("none", "flush", "fsync")
+LOG_FORMATS = ("jsonl", "binary")
+
+BINARY_MAGIC = b"MFWEVT1\n"
+_LEN = struct.Struct("<I")
+# ts, segment id, action id, score, ip kind (4, 6 or 0 = text), ip length
+_HEAD = struct.Struct("<dHHBBB")
+_U16 = struct.Struct("<H")
+# largest payload encode_binary can produce (text ip, 64 KiB domain, 255 reasons), rounded up
+_MAX_PAYLOAD = 1 << 17
 
 @dataclass
 class Event:
@@ -17,11 +39,513 @@ class Event:
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+def raw_log_name(path: Path) -> Path:
+    """``events-….jsonl.gz`` -> ``events-….jsonl``; other paths unchanged."""
+    path = Path(path)
+    return path.with_suffix("") if path.suffix in COMPRESSED_SUFFIXES else path
+
+def log_format(path: Path) -> str:
+    return "binary" if raw_log_name(path).suffix == ".bin" else "jsonl"
+
+def open_log(path: Path):
+    """Binary file object for a log, decompressing closed ``.gz`` / ``.zst`` segments."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError(f"{path}: reading zstd segments needs the 'zstandard' package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True))
+    return path.open("rb")
+
+def event_log_path(log_path: str, fmt: str) -> str:
+    """``events.jsonl`` becomes ``events.bin`` for the binary format."""
+    return str(Path(log_path).with_suffix(".bin")) if fmt == "binary" else log_path
+
+class StringTable:
+    """Append-only string dictionary stored next to a binary log as ``<log>.dict``.
+
+    One JSON string per line, the id is the line number. The writer
+    appends and flushes a new entry before any record using it is
+    committed, so readers never see an id they cannot resolve.
+    """
+
+    def __init__(self, log_path: Path):
+        self.path = Path(str(raw_log_name(log_path)) + ".dict")
+        self.strings: list[str] = []
+        self.ids: dict[str, int] = {}
+        self._f = None
+        self.reload()
+
+    def reload(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            for i, ln in enumerate(f):
+                if i < len(self.strings):
+                    continue
+                if not ln.endswith("\n"):
+                    break
+                s = json.loads(ln)
+                self.ids[s] = len(self.strings)
+                self.strings.append(s)
+
+    def id_for(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            if len(self.strings) >= 0xFFFF:
+                raise ValueError("event log string table is full")
+            if self._f is None:
+                self._f = self.path.open("a", encoding="utf-8")
+            self._f.write(json.dumps(s, ensure_ascii=False) + "\n")
+            self._f.flush()
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def get(self, i: int) -> str:
+        if i >= len(self.strings):
+            self.reload()
+        return self.strings[i] if i < len(self.strings) else f"?{i}"
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+def encode_binary(ev: Event, table: StringTable) -> bytes:
+    """Length-prefixed (and -suffixed, for reverse scans) binary record."""
+    try:
+        ts = datetime.fromisoformat(ev.ts).timestamp()
+    except (TypeError, ValueError):
+        ts = time.time()
+    ip = ev.client_ip
+    try:
+        ip_b, kind = socket.inet_pton(socket.AF_INET, ip), 4
+    except OSError:
+        try:
+            ip_b, kind = socket.inet_pton(socket.AF_INET6, ip), 6
+        except OSError:
+            ip_b, kind = ip.encode("utf-8")[:255], 0
+    dom = ev.domain.encode("utf-8")[:0xFFFF]
+    reasons = ev.reasons[:255]
+    payload = b"".join((
+        _HEAD.pack(ts, table.id_for(ev.segment), table.id_for(ev.action), max(0, min(255, int(ev.score))),
+                   kind, len(ip_b)),
+        ip_b,
+        _U16.pack(len(dom)), dom,
+        bytes((len(reasons),)),
+        b"".join(_U16.pack(table.id_for(r)) for r in reasons),
+    ))
+    n = _LEN.pack(len(payload))
+    return n + payload + n
+
+def decode_binary(payload: bytes, table: StringTable) -> dict:
+    ts, seg, act, score, kind, ip_len = _HEAD.unpack_from(payload, 0)
+    off = _HEAD.size
+    ip_b = payload[off:off + ip_len]
+    off += ip_len
+    if kind == 4:
+        ip = socket.inet_ntop(socket.AF_INET, ip_b)
+    elif kind == 6:
+        ip = socket.inet_ntop(socket.AF_INET6, ip_b)
+    else:
+        ip = ip_b.decode("utf-8", errors="replace")
+    (dom_len,) = _U16.unpack_from(payload, off)
+    off += 2
+    domain = payload[off:off + dom_len].decode("utf-8", errors="replace")
+    off += dom_len
+    n = payload[off]
+    off += 1
+    reasons = [table.get(_U16.unpack_from(payload, off + 2 * k)[0]) for k in range(n)]
+    return {
+        "ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+        "segment": table.get(seg),
+        "client_ip": ip,
+        "domain": domain,
+        "action": table.get(act),
+        "score": score,
+        "reasons": reasons,
+    }
+
+def _next_frame(buf: bytes, table: StringTable) -> int:
+    """Position of the first complete, decodable record in ``buf`` after byte 0, -1 if none."""
+    for q in range(1, len(buf) - 8):
+        (n,) = _LEN.unpack_from(buf, q)
+        end = q + n + 8
+        if n < _HEAD.size or end > len(buf) or buf[end - 4:end] != buf[q:q + 4]:
+            continue
+        try:
+            decode_binary(buf[q + 4:end - 4], table)
+        except (ValueError, IndexError, OverflowError, OSError, struct.error):
+            continue
+        return q
+    return -1
+
+def _frame_ends_at(f, end: int) -> bool:
+    """Whether a complete record finishes at byte ``end``, checked through its length suffix."""
+    if end - 8 < len(BINARY_MAGIC):
+        return False
+    f.seek(end - 4)
+    tail = f.read(4)
+    (n,) = _LEN.unpack(tail)
+    start = end - 8 - n
+    if start < len(BINARY_MAGIC):
+        return False
+    f.seek(start)
+    return f.read(4) == tail
+
+def _binary_records(f, table: StringTable, offset: int) -> Iterator[tuple[dict, int]]:
+    if offset < len(BINARY_MAGIC):
+        f.seek(0)
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{f.name} is not a MiniFW-AI binary event log")
+        offset = len(BINARY_MAGIC)
+    f.seek(offset)
+    while True:
+        head = f.read(4)
+        if len(head) == 4:
+            (n,) = _LEN.unpack(head)
+            body = f.read(n + 4) if n <= _MAX_PAYLOAD else b""
+            if len(body) == n + 4 and body[n:] == head:
+                offset += n + 8
+                yield decode_binary(body[:n], table), offset
+                continue
+        # a write still in progress at EOF, or a record torn by a crash that
+        # later writes landed behind: skip to the next complete record if any
+        f.seek(offset)
+        skip = _next_frame(f.read(2 * _MAX_PAYLOAD), table)
+        if skip < 0:
+            return
+        offset += skip
+        f.seek(offset)
+
+def _jsonl_records(f, offset: int) -> Iterator[tuple[dict, int]]:
+    f.seek(offset)
+    for line in f:
+        if not line.endswith(b"\n"):
+            # partial line still being written; pick it up next time
+            return
+        offset += len(line)
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        yield rec, offset
+
+def read_events_from(path: Path, offset: int = 0, f=None) -> Iterator[tuple[dict, int]]:
+    """``(event, offset just past it)`` from byte ``offset`` on, in either format.
+
+    Only complete records are returned, so the last offset seen is always a
+    safe place to resume from. ``f`` reads an already open ``open_log(path)``
+    (left open) instead of reopening ``path``.
+    """
+    path = Path(path)
+    if f is None:
+        with open_log(path) as f:
+            yield from read_events_from(path, offset, f)
+        return
+    if log_format(path) == "binary":
+        yield from _binary_records(f, StringTable(path), offset)
+    else:
+        yield from _jsonl_records(f, offset)
+
+def iter_binary_events(path: Path) -> Iterator[dict]:
+    """Stream records from a binary log, skipping torn records; stops quietly at a torn final one."""
+    path = Path(path)
+    with open_log(path) as f:
+        for rec, _ in _binary_records(f, StringTable(path), 0):
+            yield rec
+
+def iter_event_log(path: Path) -> Iterator[dict]:
+    """Raw event dicts from either log format (plain or compressed), picked by file suffix."""
+    return (rec for rec, _ in read_events_from(path))
+
+def _tail_jsonl(f, size: int, n: int, block_size: int) -> list[dict]:
+    out: list[dict] = []
+    pos = size
+    buf = b""
+    in_partial = True  # bytes after the last newline are a write in progress
+    while pos > 0 and len(out) < n:
+        step = min(block_size, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+        if in_partial:
+            cut = buf.rfind(b"\n")
+            if cut < 0:
+                buf = b""
+                continue
+            buf = buf[:cut]
+            in_partial = False
+        lines = buf.split(b"\n")
+        # the first piece may be cut by the block boundary; keep it for the next block
+        buf = lines.pop(0) if pos > 0 else b""
+        for line in reversed(lines):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(out) >= n:
+                break
+    return out
+
+def _tail_binary(f, path: Path, size: int, n: int) -> list[dict]:
+    table = StringTable(path)
+    out: list[dict] = []
+    end = size
+    floor = len(BINARY_MAGIC)
+    while end > floor and len(out) < n:
+        frame = b""
+        if end - 8 >= floor:
+            f.seek(end - 4)
+            (length,) = _LEN.unpack(f.read(4))
+            start = end - 8 - length
+            if start >= floor:
+                f.seek(start)
+                frame = f.read(length + 8)
+        if not frame or frame[:4] != frame[-4:]:
+            # torn record (crash mid-write); fall back to a forward scan, which skips it
+            tail = list(_binary_records(f, table, 0))
+            return [rec for rec, _ in reversed(tail[-n:])]
+        out.append(decode_binary(frame[4:-4], table))
+        end = start
+    return out
+
+def read_last_events(path: Path, n: int, block_size: int = 64 * 1024) -> list[dict]:
+    """The last ``n`` events of a log, newest first, read backwards from EOF.
+
+    Cost depends on ``n`` rather than on the size of the log. An
+    unterminated final JSONL line (write in progress) is skipped.
+    Compressed segments cannot seek backwards and are scanned forwards.
+    """
+    path = Path(path)
+    if n <= 0:
+        return []
+    if path.suffix in COMPRESSED_SUFFIXES:
+        tail = deque((rec for rec, _ in read_events_from(path)), maxlen=n)
+        tail.reverse()
+        return list(tail)
+    with path.open("rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if log_format(path) == "binary":
+            return _tail_binary(f, path, size, n)
+        return _tail_jsonl(f, size, n, block_size)
+
+def export_jsonl(src: Path, out) -> int:
+    """Stream a binary log out as JSONL (for audit export); returns records written."""
+    n = 0
+    for rec in iter_binary_events(src):
+        out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        n += 1
+    return n
+
 class EventWriter:
-    def __init__(self, path: str):
+    """Append-only event log writer that keeps the log open and group-commits.
+
+    Encoded events are buffered in memory and committed as one write when
+    ``flush_bytes`` are pending or ``flush_interval_ms`` has elapsed (a
+    background thread covers idle periods), and on ``close()``.
+    ``durability`` controls what a commit guarantees: ``"none"`` hands the
+    batch to the file object, ``"flush"`` pushes it to the OS and
+    ``"fsync"`` also waits for the disk.
+
+    ``fmt="binary"`` writes compact length-framed records (see
+    ``encode_binary``) instead of JSONL.
+
+    ``rotate="hourly"`` and/or ``segment_max_bytes`` close the log into
+    compressed segments with a manifest (see ``segments.SegmentLog``).
+    """
+
+    def __init__(self, path: str, flush_bytes: int = 64 * 1024, flush_interval_ms: int = 500,
+                 durability: str = "flush", fmt: str = "jsonl", rotate: str = "none",
+                 segment_max_bytes: int = 0, compress: str = "gzip", retention_days: float = 0,
+                 retention_max_bytes: int = 0):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        if fmt not in LOG_FORMATS:
+            raise ValueError(f"format must be one of {LOG_FORMATS}, got {fmt!r}")
         self.path = Path(path)
+        self.fmt = fmt
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_bytes = max(flush_bytes, 1)
+        self.flush_interval = max(flush_interval_ms, 1) / 1000.0
+        self.durability = durability
+
+        self.events_written = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+
+        self._segments = None
+        if rotate != "none" or segment_max_bytes > 0:
+            from .segments import SegmentLog
+            self._segments = SegmentLog(self.path, rotate=rotate,
+                                        max_bytes=segment_max_bytes, compress=compress,
+                                        retention_days=retention_days, retention_max_bytes=retention_max_bytes)
+        self._open()
+        self._buf: list[bytes] = []
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="minifw-events", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_policy(cls, path: str, cfg: dict) -> "EventWriter":
+        return cls(
+            path,
+            flush_bytes=int(cfg.get("flush_bytes", 64 * 1024)),
+            flush_interval_ms=int(cfg.get("flush_interval_ms", 500)),
+            durability=str(cfg.get("durability", "flush")),
+            fmt=str(cfg.get("format", "jsonl")),
+            rotate=str(cfg.get("rotate", "none")),
+            segment_max_bytes=int(cfg.get("segment_max_bytes", 0)),
+            compress=str(cfg.get("compress", "gzip")),
+            retention_days=float(cfg.get("retention_days", 0)),
+            retention_max_bytes=int(cfg.get("retention_max_bytes", 0)),
+        )
+
+    def _open(self) -> None:
+        self._f = self.path.open("ab")
+        self._table = None
+        if self.fmt == "binary":
+            self._table = StringTable(self.path)
+            size = self._f.tell()
+            if size < len(BINARY_MAGIC):
+                self._f.truncate(0)
+                self._f.write(BINARY_MAGIC)
+            elif size > len(BINARY_MAGIC):
+                self._trim_torn_tail(size)
+
+    def _trim_torn_tail(self, size: int) -> None:
+        """Cut a record torn by a crash off the end, so new records do not land behind it."""
+        with self.path.open("rb") as f:
+            if _frame_ends_at(f, size):
+                return
+            end = len(BINARY_MAGIC)
+            for _, end in _binary_records(f, self._table, 0):
+                pass
+        print(f"[minifw] {self.path}: dropping a torn record ({size - end} bytes) at the end of the log")
+        self._f.truncate(end)
+
+    def _encode(self, ev: Event) -> bytes:
+        if self._table is not None:
+            return encode_binary(ev, self._table)
+        # vars() instead of dataclasses.asdict(): Event is flat, no deep copy needed
+        return (json.dumps(vars(ev), ensure_ascii=False) + "\n").encode("utf-8")
 
     def write(self, ev: Event) -> None:
-        with self.path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(asdict(ev), ensure_ascii=False) + "\n")
+        # binary records hold ids into the current file's string table, which
+        # a rotation replaces, so those are encoded under the lock
+        data = self._encode(ev) if self.fmt != "binary" else None
+        with self._lock:
+            if self._segments is not None:
+                now = time.time()
+                if self._segments.due(now):
+                    # close the previous hour before this event lands in it
+                    self._commit()
+            if data is None:
+                data = self._encode(ev)
+            if self._segments is not None:
+                self._segments.note(ev.action, len(data), now)
+            self._buf.append(data)
+            self._pending += len(data)
+            self.events_written += 1
+            if self._pending >= self.flush_bytes:
+                self._commit()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        # caller holds self._lock
+        if self._buf:
+            self._write_buffer()
+        if self._segments is not None and self._segments.due(time.time()):
+            self._rotate()
+
+    def _write_buffer(self) -> None:
+        t0 = time.perf_counter()
+        self._f.write(b"".join(self._buf))
+        if self.durability != "none":
+            self._f.flush()
+            if self.durability == "fsync":
+                os.fsync(self._f.fileno())
+        elapsed = time.perf_counter() - t0
+        self.bytes_written += self._pending
+        self.flushes += 1
+        self.flush_seconds_total += elapsed
+        self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+        self._buf = []
+        self._pending = 0
+
+    def _rotate(self) -> None:
+        self._f.flush()
+        if self.durability == "fsync":
+            os.fsync(self._f.fileno())
+        self._f.close()
+        if self._table is not None:
+            self._table.close()
+        try:
+            self._segments.rotate()
+        finally:
+            self._open()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {
+                "events_written": self.events_written,
+                "bytes_written": self.bytes_written,
+                "bytes_pending": self._pending,
+                "flushes": self.flushes,
+                "flush_seconds_total": self.flush_seconds_total,
+                "flush_seconds_max": self.flush_seconds_max,
+            }
+        if self._segments is not None:
+            out.update(self._segments.stats())
+        return out
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        with self._lock:
+            self._commit()
+            self._f.flush()
+            if self.durability == "fsync":
+                os.fsync(self._f.fileno())
+            self._f.close()
+            if self._table is not None:
+                self._table.close()
+        if self._segments is not None:
+            self._segments.close()
+
+def export_main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m minifw_ai export-jsonl",
+                                 description="Convert a binary event log to JSONL.")
+    ap.add_argument("log", help="binary event log (events.bin, events.w<N>.bin)")
+    ap.add_argument("-o", "--output", help="JSONL file to write, default stdout")
+    args = ap.parse_args(argv)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            n = export_jsonl(Path(args.log), out)
+        print(f"exported {n:,} events to {args.output}", file=sys.stderr)
+    else:
+        export_jsonl(Path(args.log), sys.stdout)
+    return 0
@@ -1,6 +1,54 @@
 from __future__ import annotations
 from pathlib import Path
 import fnmatch
+import os
+import re
+
+_GLOB_CHARS = frozenset("*?[")
+_WILDCARD = None  # trie marker for "*.<suffix>" entries; never collides with a str label
+
+class DomainMatcher:
+    """Compiled form of a list of fnmatch patterns.
+
+    Exact names go into a set, ``*.example.com`` entries into a trie of
+    reversed labels and everything else into one combined regex, so a
+    lookup costs O(labels in domain) instead of O(patterns in feed).
+    Verdicts are identical to ``any(fnmatch.fnmatch(domain, p) ...)``.
+    """
+
+    def __init__(self, patterns: list[str]):
+        self.exact: set[str] = set()
+        self.suffixes: dict = {}
+        globs: list[str] = []
+        for pat in patterns:
+            pat = os.path.normcase(pat)
+            if not _GLOB_CHARS.intersection(pat):
+                self.exact.add(pat)
+            elif pat.startswith("*.") and not _GLOB_CHARS.intersection(pat[2:]):
+                node = self.suffixes
+                for label in reversed(pat[2:].split(".")):
+                    node = node.setdefault(label, {})
+                node[_WILDCARD] = True
+            else:
+                globs.append(pat)
+        self.globs = globs
+        self._glob_re = re.compile("|".join(fnmatch.translate(p) for p in globs)) if globs else None
+
+    def match(self, domain: str) -> bool:
+        domain = os.path.normcase(domain)
+        if domain in self.exact:
+            return True
+        node = self.suffixes
+        if node:
+            labels = domain.split(".")
+            for i in range(len(labels) - 1, 0, -1):
+                node = node.get(labels[i])
+                if node is None:
+                    break
+                # "*.suffix" needs at least one more (possibly empty) label in front
+                if _WILDCARD in node:
+                    return True
+        return self._glob_re is not None and self._glob_re.match(domain) is not None
 
 class FeedMatcher:
     def __init__(self, feeds_dir: str):
@@ -9,6 +57,8 @@ class FeedMatcher:
         self.allow_domains = self._load_lines(d / "allow_domains.txt")
         self.deny_ips = set(self._load_lines(d / "deny_ips.txt"))
         self.deny_asn = set(self._load_lines(d / "deny_asn.txt"))
+        self._deny_matcher = DomainMatcher(self.deny_domains)
+        self._allow_matcher = DomainMatcher(self.allow_domains)
 
     @staticmethod
     def _load_lines(path: Path) -> list[str]:
@@ -23,10 +73,10 @@ class FeedMatcher:
         return lines
 
     def domain_allowed(self, domain: str) -> bool:
-        return any(fnmatch.fnmatch(domain, pat) for pat in self.allow_domains)
+        return self._allow_matcher.match(domain)
 
     def domain_denied(self, domain: str) -> bool:
-        return any(fnmatch.fnmatch(domain, pat) for pat in self.deny_domains)
+        return self._deny_matcher.match(domain)
 
     def ip_denied(self, ip: str) -> bool:
         return ip in self.deny_ips
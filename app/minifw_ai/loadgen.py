@@ -0,0 +1,274 @@
+from __future__ import annotations
+import argparse
+import ipaddress
+import itertools
+import os
+import random
+import string
+import time
+from pathlib import Path
+
+from minifw_ai.feeds import FeedMatcher
+from minifw_ai.policy import Policy
+
+ZEEK_FIELDS = ["ts", "uid", "id.orig_h", "id.orig_p", "id.resp_h", "id.resp_p", "version", "cipher",
+               "curve", "server_name", "resumed", "established"]
+TLDS = ("com", "net", "org", "io", "co.id", "id")
+DEFAULT_SEGMENT_SUBNET = "172.31.0.0/16"  # outside the policy subnets, so scored as "default"
+
+def _label(rng: random.Random, n: int = 6) -> str:
+    return "".join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(n))
+
+def parse_segment_clients(spec: str) -> dict[str, int]:
+    """``"office=200,guest=20"`` -> ``{"office": 200, "guest": 20}``."""
+    out: dict[str, int] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, count = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"expected segment=count, got {item!r}")
+        try:
+            out[name.strip()] = int(count)
+        except ValueError:
+            raise ValueError(f"client count for {name.strip()!r} is not an integer: {count!r}")
+    return out
+
+def pick_clients(seg_map: dict[str, list[str]], per_segment: int, default_clients: int,
+                 rng: random.Random, segment_clients: dict[str, int] | None = None) -> list[str]:
+    """Random host addresses from every segment's subnets, plus some unmapped clients.
+
+    ``segment_clients`` overrides the uniform ``per_segment`` count for the
+    segments it names.
+    """
+    segment_clients = segment_clients or {}
+    unknown = sorted(set(segment_clients) - set(seg_map))
+    if unknown:
+        raise ValueError(f"unknown segment(s) {', '.join(unknown)}; policy has {', '.join(seg_map) or 'none'}")
+    plan = [(cidrs, segment_clients.get(name, per_segment)) for name, cidrs in seg_map.items()]
+    if default_clients:
+        plan.append(([DEFAULT_SEGMENT_SUBNET], default_clients))
+    clients: list[str] = []
+    for cidrs, count in plan:
+        nets = []
+        for c in cidrs:
+            try:
+                nets.append(ipaddress.ip_network(c, strict=False))
+            except ValueError:
+                continue
+        if not nets:
+            continue
+        for _ in range(count):
+            net = rng.choice(nets)
+            # skip network and broadcast addresses where there are any
+            span = net.num_addresses - 2 if net.num_addresses > 2 else net.num_addresses
+            off = 1 + rng.randrange(span) if net.num_addresses > 2 else rng.randrange(span)
+            clients.append(str(net.network_address + off))
+    return clients
+
+def benign_domains(n: int, feeds: FeedMatcher, rng: random.Random) -> list[str]:
+    """Up to ``n`` distinct made-up domains that no deny pattern matches."""
+    out: list[str] = []
+    seen: set[str] = set()
+    tries = 0
+    # a catch-all deny pattern such as ``*`` leaves nothing benign to find
+    while len(out) < n and tries < n * 50:
+        tries += 1
+        d = f"{_label(rng, rng.randint(3, 10))}.{rng.choice(TLDS)}"
+        if rng.random() < 0.5:
+            d = f"{rng.choice(('www', 'api', 'cdn', 'static', 'm'))}.{d}"
+        if d in seen or feeds.domain_denied(d):
+            continue
+        seen.add(d)
+        out.append(d)
+    return out
+
+def denied_domains(n: int, feeds: FeedMatcher, rng: random.Random) -> list[str]:
+    """Domains built from the deny feed patterns that the engine will score as denied."""
+    pats = [p for p in feeds.deny_domains if p]
+    out: list[str] = []
+    tries = 0
+    while pats and len(out) < n and tries < n * 50:
+        tries += 1
+        p = rng.choice(pats)
+        d = "".join(_label(rng, 4) if c == "*" else (rng.choice(string.ascii_lowercase) if c == "?" else c)
+                    for c in p)
+        if "[" in d:
+            continue
+        d = d.strip(".") or f"{_label(rng)}.com"
+        if "." not in d:
+            d += ".com"
+        if feeds.domain_denied(d) and not feeds.domain_allowed(d):
+            out.append(d)
+    return out
+
+def zipf_cum_weights(n: int, s: float) -> list[float]:
+    return list(itertools.accumulate(1.0 / (k ** s) for k in range(1, n + 1)))
+
+class LoadGenerator:
+    """Writes dnsmasq query lines (and optional Zeek ssl.log rows) at a target rate.
+
+    Domains are drawn from a Zipf distribution over a fixed benign
+    universe, with ``deny_ratio`` of queries replaced by names that hit the
+    deny feeds. Every ``attack_every`` seconds one random client sends
+    ``attack_size`` extra queries at once to trip burst detection.
+    """
+
+    def __init__(self, policy: Policy, feeds: FeedMatcher, domains: int = 10000, zipf_s: float = 1.1,
+                 clients_per_segment: int = 50, default_clients: int = 50, deny_ratio: float = 0.01,
+                 sni_ratio: float = 0.3, attack_every: float = 0.0, attack_size: int = 300, seed: int | None = None,
+                 segment_clients: dict[str, int] | None = None):
+        self.rng = random.Random(seed)
+        self.clients = pick_clients(policy.segment_subnets(), clients_per_segment, default_clients, self.rng,
+                                    segment_clients)
+        if not self.clients:
+            raise ValueError("no clients to simulate: segment_subnets is empty and default_clients is 0")
+        self.domains = benign_domains(domains, feeds, self.rng)
+        if not self.domains:
+            raise ValueError("no benign domains to simulate: the deny feeds match every generated name")
+        self.cum = zipf_cum_weights(len(self.domains), zipf_s)
+        self.denied = denied_domains(max(50, domains // 100), feeds, self.rng)
+        self.deny_ratio = deny_ratio if self.denied else 0.0
+        self.sni_ratio = sni_ratio
+        self.attack_every = attack_every
+        self.attack_size = attack_size
+        self.dns_lines = 0
+        self.sni_rows = 0
+        self.deny_hits = 0
+        self.attacks = 0
+        self._uid = itertools.count(1)
+
+    def queries(self, k: int) -> list[tuple[str, str]]:
+        rng = self.rng
+        doms = rng.choices(self.domains, cum_weights=self.cum, k=k)
+        clients = rng.choices(self.clients, k=k)
+        if self.deny_ratio:
+            for i in range(k):
+                if rng.random() < self.deny_ratio:
+                    doms[i] = rng.choice(self.denied)
+                    self.deny_hits += 1
+        return list(zip(clients, doms))
+
+    def attack(self) -> list[tuple[str, str]]:
+        self.attacks += 1
+        ip = self.rng.choice(self.clients)
+        doms = self.rng.choices(self.domains, cum_weights=self.cum, k=self.attack_size)
+        return [(ip, d) for d in doms]
+
+    @staticmethod
+    def dns_line(now: float, client_ip: str, domain: str) -> str:
+        return f"{time.strftime('%b %e %H:%M:%S', time.localtime(now))} dnsmasq[4242]: query[A] {domain} from {client_ip}\n"
+
+    def zeek_row(self, now: float, client_ip: str, domain: str) -> str:
+        rng = self.rng
+        resp = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        return "\t".join((f"{now:.6f}", f"C{next(self._uid):017x}", client_ip, str(rng.randint(1024, 65535)),
+                          resp, "443", "TLSv13", "TLS_AES_128_GCM_SHA256", "x25519", domain, "F", "T")) + "\n"
+
+    @staticmethod
+    def zeek_header() -> str:
+        return ("#separator \\x09\n#set_separator\t,\n#empty_field\t(empty)\n#unset_field\t-\n"
+                "#path\tssl\n#fields\t" + "\t".join(ZEEK_FIELDS) + "\n")
+
+    def run(self, dns_out: Path, zeek_out: Path | None = None, rate: float = 1000.0, duration: float | None = None,
+            count: int | None = None, append: bool = True, tick: float = 0.01) -> None:
+        """Generate until ``duration`` seconds or ``count`` DNS lines; ``rate <= 0`` means flat out."""
+        mode = "a" if append else "w"
+        dns_f = dns_out.open(mode, encoding="utf-8")
+        zeek_f = None
+        if zeek_out is not None:
+            fresh = not append or not zeek_out.exists() or zeek_out.stat().st_size == 0
+            zeek_f = zeek_out.open(mode, encoding="utf-8")
+            if fresh:
+                zeek_f.write(self.zeek_header())
+        start = time.monotonic()
+        next_attack = start + self.attack_every if self.attack_every > 0 else None
+        paced = 0
+        try:
+            while True:
+                now_m = time.monotonic()
+                elapsed = now_m - start
+                if duration is not None and elapsed >= duration:
+                    break
+                if count is not None and self.dns_lines >= count:
+                    break
+                if rate > 0:
+                    # pace against the schedule, so a slow tick is caught up on the next one
+                    k = max(0, int(rate * (elapsed + tick)) - paced)
+                else:
+                    k = 5000
+                if count is not None:
+                    k = min(k, count - self.dns_lines)
+                batch = self.queries(k) if k else []
+                paced += k
+                if next_attack is not None and now_m >= next_attack:
+                    attack = self.attack()
+                    if count is not None:
+                        attack = attack[:count - self.dns_lines - len(batch)]
+                    batch.extend(attack)
+                    next_attack += self.attack_every
+                now = time.time()
+                dns_f.write("".join(self.dns_line(now, ip, d) for ip, d in batch))
+                self.dns_lines += len(batch)
+                if zeek_f is not None and self.sni_ratio > 0:
+                    rows = [self.zeek_row(now, ip, d) for ip, d in batch if self.rng.random() < self.sni_ratio]
+                    zeek_f.write("".join(rows))
+                    self.sni_rows += len(rows)
+                    zeek_f.flush()
+                # flush per tick so a live tailer sees a steady stream
+                dns_f.flush()
+                if rate > 0:
+                    delay = start + (elapsed + tick) - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            dns_f.close()
+            if zeek_f is not None:
+                zeek_f.close()
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m minifw_ai loadgen",
+                                 description="Write synthetic dnsmasq / Zeek ssl.log traffic for load testing.")
+    ap.add_argument("dnsmasq_out", help="dnsmasq log to write (appended to by default)")
+    ap.add_argument("--zeek-out", help="Zeek ssl.log to write alongside")
+    ap.add_argument("--policy", default=os.environ.get("MINIFW_POLICY", "/opt/minifw_ai/config/policy.json"))
+    ap.add_argument("--feeds", default=os.environ.get("MINIFW_FEEDS", "/opt/minifw_ai/config/feeds"))
+    ap.add_argument("--rate", type=float, default=1000.0, help="DNS queries per second, 0 = as fast as possible")
+    ap.add_argument("--duration", type=float, help="seconds to run")
+    ap.add_argument("--count", type=int, help="DNS lines to write")
+    ap.add_argument("--domains", type=int, default=10000, help="size of the benign domain universe")
+    ap.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent for domain popularity")
+    ap.add_argument("--clients-per-segment", type=int, default=50, help="clients in each segment not listed below")
+    ap.add_argument("--segment-clients", default="",
+                    help="per-segment client counts, e.g. office=200,guest=20")
+    ap.add_argument("--default-clients", type=int, default=50, help="clients outside every segment subnet")
+    ap.add_argument("--deny-ratio", type=float, default=0.01, help="fraction of queries hitting the deny feeds")
+    ap.add_argument("--sni-ratio", type=float, default=0.3, help="fraction of queries that also emit an SNI row")
+    ap.add_argument("--attack-every", type=float, default=0.0, help="seconds between query bursts, 0 = none")
+    ap.add_argument("--attack-size", type=int, default=300, help="queries per burst from one client")
+    ap.add_argument("--truncate", action="store_true", help="overwrite the output files instead of appending")
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args(argv)
+    if args.duration is None and args.count is None:
+        ap.error("give --duration and/or --count")
+
+    try:
+        gen = LoadGenerator(Policy(args.policy), FeedMatcher(args.feeds), domains=args.domains, zipf_s=args.zipf_s,
+                            clients_per_segment=args.clients_per_segment, default_clients=args.default_clients,
+                            deny_ratio=args.deny_ratio, sni_ratio=args.sni_ratio, attack_every=args.attack_every,
+                            attack_size=args.attack_size, seed=args.seed,
+                            segment_clients=parse_segment_clients(args.segment_clients))
+    except ValueError as e:
+        ap.error(str(e))
+    t0 = time.monotonic()
+    try:
+        gen.run(Path(args.dnsmasq_out), Path(args.zeek_out) if args.zeek_out else None, rate=args.rate,
+                duration=args.duration, count=args.count, append=not args.truncate)
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.monotonic() - t0
+    print(f"wrote {gen.dns_lines:,} DNS lines ({gen.dns_lines / elapsed if elapsed else 0:,.0f}/s), "
+          f"{gen.sni_rows:,} SNI rows, {gen.deny_hits:,} deny hits, {gen.attacks} bursts "
+          f"from {len(gen.clients)} clients in {elapsed:.1f}s")
+    return 0
@@ -1,20 +1,21 @@
 from __future__ import annotations
+import multiprocessing
 import os
+import queue
+import signal
+import sys
+import time
+import zlib
+from pathlib import Path
 
-from minifw_ai.policy import Policy
-from minifw_ai.feeds import FeedMatcher
-from minifw_ai.netutil import ip_in_any_subnet
-from minifw_ai.events import Event, EventWriter, now_iso
-from minifw_ai.enforce import ipset_create, ipset_add, nft_apply_forward_drop
+from minifw_ai.state import StateReloader, VerdictCache
+from minifw_ai.events import Event, EventWriter, event_log_path, now_iso
+from minifw_ai.enforce import ipset_create, nft_apply_forward_drop, nft_create_set, BatchEnforcer
 from minifw_ai.collector_dnsmasq import stream_dns_events
 from minifw_ai.collector_zeek import stream_zeek_sni_events
 from minifw_ai.burst import BurstTracker
-
-def segment_for_ip(ip: str, mapping: dict[str, list[str]]) -> str:
-    for seg, cidrs in mapping.items():
-        if ip_in_any_subnet(ip, cidrs):
-            return seg
-    return "default"
+from minifw_ai.pipeline import EventMux
+from minifw_ai.metrics import REGISTRY, EVENTS, DECISIONS, STAGE_SECONDS, serve, listen_for_shard
 
 def score_and_decide(domain: str, denied: bool, sni_denied: bool, asn_denied: bool, burst_hit: int, weights: dict, thresholds):
     score = 0
@@ -37,80 +38,272 @@ def score_and_decide(domain: str, denied: bool, sni_denied: bool, asn_denied: bo
         return score, reasons, "monitor"
     return score, reasons, "allow"
 
-def run():
-    policy_path = os.environ.get("MINIFW_POLICY", "/opt/minifw_ai/config/policy.json")
-    feeds_dir = os.environ.get("MINIFW_FEEDS", "/opt/minifw_ai/config/feeds")
-    log_path = os.environ.get("MINIFW_LOG", "/opt/minifw_ai/logs/events.jsonl")
+class Scorer:
+    """Per-process scoring state: verdict cache, burst counters, last SNI."""
 
-    pol = Policy(policy_path)
-    feeds = FeedMatcher(feeds_dir)
-    writer = EventWriter(log_path)
+    def __init__(self, pol, reloader: StateReloader, enforcer: BatchEnforcer, writer: EventWriter):
+        cache_cfg = pol.cache()
+        self.reloader = reloader
+        self.enforcer = enforcer
+        self.writer = writer
+        self.verdicts = VerdictCache(max_entries=int(cache_cfg.get("verdict_max_entries", 50000)),
+                                     ttl_seconds=float(cache_cfg.get("verdict_ttl_seconds", 300)))
+        self.burst = BurstTracker(window_seconds=60, max_clients=int(pol.burst().get("max_tracked_clients", 100000)))
+        self.last_sni: dict[str, str] = {}
+        self._events = {src: EVENTS.labels(src) for src in ("dnsmasq", "zeek")}
+        self._t_segment = STAGE_SECONDS.labels("segment")
+        self._t_feed = STAGE_SECONDS.labels("feed_match")
+        self._t_score = STAGE_SECONDS.labels("score")
+        self._t_enforce = STAGE_SECONDS.labels("enforce")
+        self._t_write = STAGE_SECONDS.labels("write")
 
-    enf = pol.enforcement()
-    set_name = enf.get("ipset_name_v4", "minifw_block_v4")
-    timeout = int(enf.get("ip_timeout_seconds", 86400))
-    table = enf.get("nft_table", "inet")
-    chain = enf.get("nft_chain", "forward")
+    def handle(self, source: str, client_ip: str, domain: str) -> None:
+        self._events[source].inc()
+        if source == "zeek":
+            self.last_sni[client_ip] = domain
+            return
 
-    ipset_create(set_name, timeout)
-    nft_apply_forward_drop(set_name, table=table, chain=chain)
+        t0 = time.perf_counter()
+        # one snapshot per event; a reload swaps in a new state between events
+        st = self.reloader.state
+        segment = st.segments.lookup(client_ip)
+        t1 = time.perf_counter()
+
+        thr, denied = self.verdicts.lookup(st, segment, domain)
+        sni = self.last_sni.get(client_ip, "")
+        sni_denied = bool(sni and self.verdicts.lookup(st, segment, sni)[1])
+        t2 = time.perf_counter()
+
+        asn_denied = False  # placeholder for offline ASN integration
+
+        qpm = self.burst.add(client_ip)
+        burst_hit = 1 if (qpm >= st.block_qpm or qpm >= st.monitor_qpm) else 0
+
+        score, reasons, action = score_and_decide(domain, denied, sni_denied, asn_denied, burst_hit, st.weights, thr)
+        t3 = time.perf_counter()
+
+        if action == "block":
+            self.enforcer.add(client_ip)
+        t4 = time.perf_counter()
+
+        self.writer.write(Event(ts=now_iso(), segment=segment, client_ip=client_ip, domain=domain,
+                                action=action, score=score, reasons=reasons))
+        t5 = time.perf_counter()
+
+        self._t_segment.observe(t1 - t0)
+        self._t_feed.observe(t2 - t1)
+        self._t_score.observe(t3 - t2)
+        self._t_enforce.observe(t4 - t3)
+        self._t_write.observe(t5 - t4)
+        DECISIONS.labels(action).inc()
+
+    def collect(self):
+        """Scrape-time gauges built from the components' stats()."""
+        yield ("minifw_verdict_cache", "gauge", "Verdict cache counters",
+               [({"stat": k}, v) for k, v in self.verdicts.stats().items()])
+        yield ("minifw_burst_tracked_clients", "gauge", "Clients tracked by the burst detector",
+               [({}, len(self.burst))])
+        yield ("minifw_burst_evicted", "gauge", "Clients evicted from the burst detector",
+               [({}, self.burst.evicted)])
+        yield ("minifw_enforce", "gauge", "Enforcer counters",
+               [({"stat": k}, v) for k, v in self.enforcer.stats().items()])
+        yield ("minifw_event_writer", "gauge", "Event writer counters",
+               [({"stat": k}, v) for k, v in self.writer.stats().items()])
+        yield ("minifw_reload", "gauge", "Policy/feed hot reload",
+               [({"stat": k}, v) for k, v in self.reloader.stats().items() if k != "last_error"])
+
+def shard_log_path(log_path: str, shard: int) -> str:
+    p = Path(log_path)
+    return str(p.with_name(f"{p.stem}.w{shard}{p.suffix}"))
 
-    burst_cfg = pol.burst()
-    monitor_qpm = int(burst_cfg.get("dns_queries_per_minute_monitor", 120))
-    block_qpm = int(burst_cfg.get("dns_queries_per_minute_block", 240))
-    burst = BurstTracker(window_seconds=60)
+def _shard_worker(shard: int, inbox, policy_path: str, feeds_dir: str, log_path: str) -> None:
+    # Ctrl-C and systemd's SIGTERM reach the whole process group; let the reader
+    # shut us down via the queue so the batches it still holds are scored first
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
 
-    seg_map = pol.segment_subnets()
-    weights = pol.features()
-    col = pol.collectors()
+    reloader = StateReloader(policy_path, feeds_dir)
+    signal.signal(signal.SIGHUP, lambda *_: reloader.request())
+    pol = reloader.state.policy
+    writer = EventWriter.from_policy(shard_log_path(log_path, shard), pol.events())
+    enforcer = BatchEnforcer.from_policy(pol.enforcement())
+    scorer = Scorer(pol, reloader, enforcer, writer)
+    REGISTRY.add_collector(scorer.collect)
+    listen = pol.metrics().get("listen", "127.0.0.1:9108")
+    if listen:
+        serve(REGISTRY, listen_for_shard(listen, shard), {"shard": str(shard)})
+    try:
+        reloader.start()
+        while True:
+            batch = inbox.get()
+            if batch is None:
+                break
+            for source, client_ip, domain in batch:
+                scorer.handle(source, client_ip, domain)
+    finally:
+        reloader.close()
+        enforcer.close()
+        writer.close()
+
+def _mux_families(mux: EventMux):
+    stats = mux.stats()
+    yield ("minifw_source_queued", "gauge", "Events read but not yet scored, per source",
+           [({"source": n}, st["queued"]) for n, st in stats.items()])
+    yield ("minifw_source_lag_seconds", "gauge", "Queue lag of the last consumed event, per source",
+           [({"source": n}, st["lag_seconds_last"]) for n, st in stats.items()])
+    yield ("minifw_source_lag_seconds_max", "gauge", "Worst queue lag seen, per source",
+           [({"source": n}, st["lag_seconds_max"]) for n, st in stats.items()])
+
+def _build_mux(col: dict) -> EventMux:
     dns_log = col.get("dnsmasq_log_path", "/var/log/dnsmasq.log")
     zeek_ssl = col.get("zeek_ssl_log_path", "/var/log/zeek/ssl.log")
     use_zeek = bool(col.get("use_zeek_sni", False))
+    state_dir = Path(col.get("checkpoint_dir", "/opt/minifw_ai/state"))
 
-    zeek_iter = None
-    last_sni = {}
+    mux = EventMux(queue_size=int(col.get("queue_size", 10000)))
+    mux.add_source("dnsmasq", stream_dns_events(dns_log, checkpoint_path=str(state_dir / "dnsmasq.offset")))
     if use_zeek:
-        try:
-            zeek_iter = stream_zeek_sni_events(zeek_ssl)
-        except Exception:
-            zeek_iter = None
+        # SNI is best effort: a missing or broken ssl.log must not stop DNS scoring
+        mux.add_source("zeek", stream_zeek_sni_events(zeek_ssl, checkpoint_path=str(state_dir / "zeek_ssl.offset")),
+                       required=False)
+    return mux
 
-    def pump_zeek():
-        if zeek_iter is None:
-            return
-        for _ in range(3):
-            try:
-                client_ip, sni = next(zeek_iter)
-                last_sni[client_ip] = sni
-            except Exception:
-                break
+def _run_sharded(pol, workers: int, policy_path: str, feeds_dir: str, log_path: str) -> None:
+    """Reader process: tail the collectors and fan events out by client-IP hash.
 
-    for client_ip, domain in stream_dns_events(dns_log):
-        pump_zeek()
+    Every worker owns the burst state, SNI map, enforcement batch and event
+    log (``events.w<N>.jsonl``) for its share of clients. SNI records are
+    routed with the same hash so they land next to that client's DNS.
+    """
+    eng = pol.engine()
+    batch_size = max(int(eng.get("batch_size", 256)), 1)
+    # fork before any thread is started in this process
+    ctx = multiprocessing.get_context("fork")
+    inboxes = [ctx.Queue(maxsize=int(eng.get("queue_batches", 1024))) for _ in range(workers)]
+    procs = [ctx.Process(target=_shard_worker, args=(i, inboxes[i], policy_path, feeds_dir, log_path),
+                         name=f"minifw-worker-{i}", daemon=True)
+             for i in range(workers)]
+    for proc in procs:
+        proc.start()
+    signal.signal(signal.SIGHUP, lambda *_: [os.kill(p.pid, signal.SIGHUP) for p in procs if p.pid])
 
-        segment = segment_for_ip(client_ip, seg_map)
-        thr = pol.thresholds(segment)
+    mux = _build_mux(pol.collectors())
+    REGISTRY.add_collector(lambda: _mux_families(mux))
+    listen = pol.metrics().get("listen", "127.0.0.1:9108")
+    if listen:
+        serve(REGISTRY, listen, {"shard": "reader"})
+    pending: list[list] = [[] for _ in range(workers)]
 
-        if feeds.domain_allowed(domain):
-            denied = False
-        else:
-            denied = feeds.domain_denied(domain)
+    def check_workers() -> None:
+        # forking a replacement is unsafe once the mux threads run; exit and
+        # let systemd (Restart=always) bring the whole engine back instead
+        for i, proc in enumerate(procs):
+            if not proc.is_alive():
+                raise RuntimeError(f"shard worker {i} exited with code {proc.exitcode}; stopping the engine")
 
-        sni = last_sni.get(client_ip, "")
-        sni_denied = bool(sni and (not feeds.domain_allowed(sni)) and feeds.domain_denied(sni))
+    def send(shard: int, item) -> None:
+        while True:
+            try:
+                inboxes[shard].put(item, timeout=1.0)
+                return
+            except queue.Full:
+                check_workers()
 
-        asn_denied = False  # placeholder for offline ASN integration
+    last_check = time.monotonic()
+    try:
+        mux.start()
+        for source, (client_ip, domain) in mux:
+            shard = zlib.crc32(client_ip.encode()) % workers
+            buf = pending[shard]
+            buf.append((source, client_ip, domain))
+            if len(buf) >= batch_size:
+                send(shard, buf)
+                pending[shard] = []
+            elif mux.idle():
+                # caught up with the logs: do not hold decisions back for batching
+                for i, b in enumerate(pending):
+                    if b:
+                        send(i, b)
+                        pending[i] = []
+            if time.monotonic() - last_check >= 1.0:
+                check_workers()
+                last_check = time.monotonic()
+    finally:
+        mux.close()
+        # the tailers have checkpointed past whatever is still queued
+        for source, (client_ip, domain) in mux.drain():
+            pending[zlib.crc32(client_ip.encode()) % workers].append((source, client_ip, domain))
+        for i, proc in enumerate(procs):
+            if not proc.is_alive():
+                continue
+            try:
+                for k in range(0, len(pending[i]), batch_size):
+                    inboxes[i].put(pending[i][k:k + batch_size], timeout=5.0)
+                inboxes[i].put(None, timeout=5.0)
+            except queue.Full:
+                print(f"[minifw] shard worker {i} is not draining its queue; killing it")
+                proc.kill()
+        for i, proc in enumerate(procs):
+            proc.join(10)
+            if proc.is_alive():
+                # workers ignore SIGTERM, so multiprocessing's exit handler could not stop it
+                print(f"[minifw] shard worker {i} did not stop; killing it")
+                proc.kill()
+                proc.join()
 
-        qpm = burst.add(client_ip)
-        burst_hit = 1 if (qpm >= block_qpm or qpm >= monitor_qpm) else 0
+def run():
+    policy_path = os.environ.get("MINIFW_POLICY", "/opt/minifw_ai/config/policy.json")
+    feeds_dir = os.environ.get("MINIFW_FEEDS", "/opt/minifw_ai/config/feeds")
+    log_path = os.environ.get("MINIFW_LOG", "/opt/minifw_ai/logs/events.jsonl")
 
-        score, reasons, action = score_and_decide(domain, denied, sni_denied, asn_denied, burst_hit, weights, thr)
+    reloader = StateReloader(policy_path, feeds_dir)
+    pol = reloader.state.policy
+    log_path = event_log_path(log_path, str(pol.events().get("format", "jsonl")))
 
-        if action == "block":
-            ipset_add(set_name, client_ip, timeout)
+    enf = pol.enforcement()
+    set_name = enf.get("ipset_name_v4", "minifw_block_v4")
+    timeout = int(enf.get("ip_timeout_seconds", 86400))
+    table = enf.get("nft_table", "inet")
+    chain = enf.get("nft_chain", "forward")
+
+    if enf.get("batch_mode", "ipset") == "nft":
+        nft_create_set(set_name, timeout, table=table)
+    else:
+        ipset_create(set_name, timeout)
+    nft_apply_forward_drop(set_name, table=table, chain=chain)
+
+    # systemd stops us with SIGTERM; unwind through the finally blocks so
+    # buffered events and pending blocks are committed.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    workers = int(pol.engine().get("workers", 1))
+    if workers > 1:
+        _run_sharded(pol, workers, policy_path, feeds_dir, log_path)
+        return
 
-        writer.write(Event(ts=now_iso(), segment=segment, client_ip=client_ip, domain=domain,
-                           action=action, score=score, reasons=reasons))
+    signal.signal(signal.SIGHUP, lambda *_: reloader.request())
+    writer = EventWriter.from_policy(log_path, pol.events())
+    enforcer = BatchEnforcer.from_policy(enf)
+    scorer = Scorer(pol, reloader, enforcer, writer)
+    mux = _build_mux(pol.collectors())
+    REGISTRY.add_collector(scorer.collect)
+    REGISTRY.add_collector(lambda: _mux_families(mux))
+    listen = pol.metrics().get("listen", "127.0.0.1:9108")
+    if listen:
+        serve(REGISTRY, listen)
+    try:
+        reloader.start()
+        mux.start()
+        for source, (client_ip, domain) in mux:
+            scorer.handle(source, client_ip, domain)
+    finally:
+        reloader.close()
+        mux.close()
+        # the tailers have checkpointed past whatever is still queued
+        for source, (client_ip, domain) in mux.drain():
+            scorer.handle(source, client_ip, domain)
+        enforcer.close()
+        writer.close()
 
 if __name__ == "__main__":
     run()
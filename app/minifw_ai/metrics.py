@@ -0,0 +1,306 @@
+from __future__ import annotations
+import http.client
+import math
+import os
+import socket
+import socketserver
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable
+
+# stdlib only: this module is also imported by the web app as app.minifw_ai.metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def _fmt_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if v == -math.inf:
+        return "-Inf"
+    if isinstance(v, int) or float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+def _fmt_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    esc = lambda s: str(s).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: float = 1) -> None:
+        self.value += n
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+    def dec(self, n: float = 1) -> None:
+        self.value -= n
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Return the child for one label combination; bind it once on hot paths."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self) -> Iterable[tuple[str, dict, float]]:
+        for key, child in list(self._children.items()):
+            yield "", dict(zip(self.labelnames, key)), child.value
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, n: float = 1) -> None:
+        self._default.inc(n)
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, v: float) -> None:
+        self._default.set(v)
+
+    def inc(self, n: float = 1) -> None:
+        self._default.inc(n)
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, v: float) -> None:
+        self._default.observe(v)
+
+    def totals(self) -> dict[str, tuple[int, float]]:
+        """``{first label value: (count, sum)}``, for quick reports."""
+        return {(key[0] if key else ""): (sum(c.counts), c.sum) for key, c in list(self._children.items())}
+
+    def samples(self) -> Iterable[tuple[str, dict, float]]:
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            acc = 0
+            for bound, n in zip(self.bounds + (math.inf,), list(child.counts)):
+                acc += n
+                yield "_bucket", {**labels, "le": _fmt_value(bound)}, acc
+            yield "_sum", labels, child.sum
+            yield "_count", labels, acc
+
+# (name, type, help, [(labels, value), ...]) produced on demand at scrape time
+Family = tuple[str, str, str, list[tuple[dict, float]]]
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text format.
+
+    Updates are plain attribute increments under the GIL, with no locking on
+    the hot path; a concurrent scrape may see a histogram mid-update, which
+    Prometheus tolerates. ``add_collector`` registers callbacks that turn
+    existing ``stats()`` dicts into gauges at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+
+    def _register(self, m: _Metric) -> _Metric:
+        if m.name in self._metrics:
+            raise ValueError(f"metric {m.name} already registered")
+        self._metrics[m.name] = m
+        return m
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, fn: Callable[[], Iterable[Family]]) -> None:
+        self._collectors.append(fn)
+
+    def render(self, const_labels: dict | None = None) -> str:
+        const_labels = const_labels or {}
+        out: list[str] = []
+        for m in list(self._metrics.values()):
+            out.append(f"# HELP {m.name} {m.help}")
+            out.append(f"# TYPE {m.name} {m.type}")
+            for suffix, labels, value in m.samples():
+                out.append(f"{m.name}{suffix}{_fmt_labels({**const_labels, **labels})} {_fmt_value(value)}")
+        for fn in list(self._collectors):
+            try:
+                families = list(fn())
+            except Exception:
+                continue
+            for name, mtype, help, samples in families:
+                out.append(f"# HELP {name} {help}")
+                out.append(f"# TYPE {name} {mtype}")
+                for labels, value in samples:
+                    out.append(f"{name}{_fmt_labels({**const_labels, **labels})} {_fmt_value(value)}")
+        return "\n".join(out) + "\n"
+
+def merge_exposition(texts: Iterable[str]) -> str:
+    """Merge several text expositions so each metric family appears once.
+
+    Needed when stitching together scrapes of several processes (sharded
+    workers, engine plus web app); samples must carry distinguishing labels.
+    """
+    order: list[str] = []
+    meta: dict[str, list[str]] = {}
+    samples: dict[str, list[str]] = {}
+    for text in texts:
+        current = None
+        for ln in text.splitlines():
+            if not ln.strip():
+                continue
+            if ln.startswith("# HELP ") or ln.startswith("# TYPE "):
+                current = ln.split(" ", 3)[2]
+                if current not in meta:
+                    order.append(current)
+                    meta[current] = []
+                    samples[current] = []
+                if len(meta[current]) < 2:
+                    meta[current].append(ln)
+                continue
+            if ln.startswith("#"):
+                continue
+            name = ln.split("{", 1)[0].split(" ", 1)[0]
+            family = current if current and name.startswith(current) else name
+            if family not in meta:
+                order.append(family)
+                meta[family] = []
+                samples[family] = []
+            samples[family].append(ln)
+    out: list[str] = []
+    for family in order:
+        out.extend(meta[family])
+        out.extend(samples[family])
+    return "\n".join(out) + "\n"
+
+def listen_for_shard(listen: str, shard: int) -> str:
+    """Worker ``shard`` listens next to the reader: port+1+shard or <sock>.w<shard>."""
+    if listen.startswith("unix:"):
+        return f"{listen}.w{shard}"
+    host, _, port = listen.rpartition(":")
+    return f"{host}:{int(port) + 1 + shard}"
+
+class _Handler(BaseHTTPRequestHandler):
+    registry: Registry = None
+    const_labels: dict = {}
+
+    def do_GET(self):
+        body = self.registry.render(self.const_labels).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        conn, _ = super().get_request()
+        # BaseHTTPRequestHandler expects an (host, port) style address
+        return conn, ("unix", 0)
+
+def serve(registry: Registry, listen: str, const_labels: dict | None = None):
+    """Expose ``registry`` over HTTP on ``host:port`` or ``unix:/path`` in a daemon thread."""
+    handler = type("MetricsHandler", (_Handler,), {"registry": registry, "const_labels": const_labels or {}})
+    if listen.startswith("unix:"):
+        path = listen[len("unix:"):]
+        if os.path.exists(path):
+            os.unlink(path)
+        server = _UnixHTTPServer(path, handler)
+    else:
+        host, _, port = listen.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+        server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="minifw-metrics", daemon=True).start()
+    return server
+
+def scrape(listen: str, timeout: float = 1.0) -> str:
+    """Fetch an exposition from ``host:port`` or ``unix:/path``; empty string if unreachable."""
+    try:
+        if listen.startswith("unix:"):
+            conn = http.client.HTTPConnection("localhost", timeout=timeout)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(listen[len("unix:"):])
+            conn.sock = sock
+        else:
+            host, _, port = listen.rpartition(":")
+            conn = http.client.HTTPConnection(host or "127.0.0.1", int(port), timeout=timeout)
+        try:
+            conn.request("GET", "/metrics")
+            resp = conn.getresponse()
+            return resp.read().decode("utf-8") if resp.status == 200 else ""
+        finally:
+            conn.close()
+    except OSError:
+        return ""
+
+# Engine-wide metrics. Each engine process (reader or shard worker) has its own copy.
+REGISTRY = Registry()
+EVENTS = REGISTRY.counter("minifw_events_total", "Events consumed by the scoring loop", ("source",))
+DECISIONS = REGISTRY.counter("minifw_decisions_total", "Scoring decisions by action", ("action",))
+STAGE_SECONDS = REGISTRY.histogram("minifw_stage_seconds", "Time spent per pipeline stage", ("stage",))
+ENFORCE_FLUSH_SECONDS = REGISTRY.histogram("minifw_enforce_flush_seconds",
+                                           "Time spent pushing blocks to the kernel", ("mode",))
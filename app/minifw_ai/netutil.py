@@ -1,5 +1,6 @@
 from __future__ import annotations
 import ipaddress
+from functools import lru_cache
 
 def ip_in_any_subnet(ip: str, cidrs: list[str]) -> bool:
     try:
@@ -13,3 +14,54 @@ def ip_in_any_subnet(ip: str, cidrs: list[str]) -> bool:
         except ValueError:
             continue
     return False
+
+class SubnetTable:
+    """Longest-prefix-match table mapping client IPs to segment names.
+
+    Built once from ``Policy.segment_subnets()``; each lookup walks at most
+    32 (v4) or 128 (v6) bits of a binary trie keyed on the integer address,
+    with an LRU in front for hot clients. Invalid CIDRs are skipped and
+    unmatched or unparsable IPs fall back to ``default``. If the same CIDR
+    is listed under several segments, the first one wins.
+    """
+
+    def __init__(self, mapping: dict[str, list[str]], default: str = "default", cache_size: int = 65536):
+        self.default = default
+        # node layout: [child0, child1, segment]
+        self._roots: dict[int, list] = {4: [None, None, None], 6: [None, None, None]}
+        for seg, cidrs in mapping.items():
+            for c in cidrs:
+                try:
+                    net = ipaddress.ip_network(c, strict=False)
+                except ValueError:
+                    continue
+                self._insert(net, seg)
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _insert(self, net, seg: str) -> None:
+        node = self._roots[net.version]
+        key = int(net.network_address)
+        top = net.max_prefixlen - 1
+        for i in range(net.prefixlen):
+            b = (key >> (top - i)) & 1
+            if node[b] is None:
+                node[b] = [None, None, None]
+            node = node[b]
+        if node[2] is None:
+            node[2] = seg
+
+    def _lookup(self, ip: str) -> str:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return self.default
+        node = self._roots[addr.version]
+        key = int(addr)
+        best = node[2]
+        for i in range(addr.max_prefixlen - 1, -1, -1):
+            node = node[(key >> i) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                best = node[2]
+        return best if best is not None else self.default
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Any, Iterable, Iterator
+
+class SourceStats:
+    __slots__ = ("name", "received", "consumed", "lag_last", "lag_max", "lag_total", "error", "done")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.received = 0
+        self.consumed = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_total = 0.0
+        self.error: BaseException | None = None
+        self.done = False
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "consumed": self.consumed,
+            "queued": self.received - self.consumed,
+            "lag_seconds_last": self.lag_last,
+            "lag_seconds_max": self.lag_max,
+            "lag_seconds_avg": self.lag_total / self.consumed if self.consumed else 0.0,
+            "error": repr(self.error) if self.error else None,
+        }
+
+class EventMux:
+    """Merges several blocking collector streams into one consumer.
+
+    Every source runs in its own thread and feeds a bounded per-source
+    queue; producers block when their queue is full, so a slow consumer
+    applies backpressure to the log tailers instead of dropping events.
+    The consumer takes one item from each non-empty queue in turn, so a
+    busy source cannot starve a quiet one. Lag is the time an item spent
+    queued before it was consumed, tracked per source.
+
+    Iteration yields ``(source_name, item)`` and raises the original
+    exception if a source added with ``required=True`` fails.
+
+    The tailers checkpoint an item once it is queued, so on shutdown call
+    ``close()`` and then consume ``drain()``: anything left in the queues
+    would otherwise be skipped by the next run.
+    """
+
+    def __init__(self, queue_size: int = 10000):
+        self.queue_size = max(queue_size, 1)
+        self._queues: dict[str, deque] = {}
+        self._stats: dict[str, SourceStats] = {}
+        self._required: set[str] = set()
+        self._threads: list[threading.Thread] = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def add_source(self, name: str, it: Iterable[Any], required: bool = True) -> None:
+        self._queues[name] = deque()
+        self._stats[name] = SourceStats(name)
+        if required:
+            self._required.add(name)
+        t = threading.Thread(target=self._produce, args=(name, it), name=f"minifw-src-{name}", daemon=True)
+        self._threads.append(t)
+
+    def start(self) -> None:
+        for t in self._threads:
+            t.start()
+
+    def _produce(self, name: str, it: Iterable[Any]) -> None:
+        q = self._queues[name]
+        st = self._stats[name]
+        gen = iter(it)
+        try:
+            for item in gen:
+                with self._cond:
+                    while len(q) >= self.queue_size and not self._stop.is_set():
+                        self._cond.wait()
+                    # queue the item in hand even when stopping: the tailer already counted it
+                    q.append((time.monotonic(), item))
+                    st.received += 1
+                    self._cond.notify_all()
+                    if self._stop.is_set():
+                        break
+        except Exception as e:
+            st.error = e
+        finally:
+            close = getattr(gen, "close", None)
+            if close is not None:
+                close()
+            with self._cond:
+                st.done = True
+                self._cond.notify_all()
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        names = list(self._queues)
+        i = 0
+        while not self._stop.is_set():
+            with self._cond:
+                picked = None
+                for k in range(len(names)):
+                    name = names[(i + k) % len(names)]
+                    if self._queues[name]:
+                        picked = name
+                        i = (i + k + 1) % len(names)
+                        break
+                if picked is None:
+                    for name in self._required:
+                        if self._stats[name].error is not None:
+                            raise self._stats[name].error
+                    if all(s.done for s in self._stats.values()):
+                        return
+                    self._cond.wait(1.0)
+                    continue
+                enq, item = self._queues[picked].popleft()
+                st = self._stats[picked]
+                st.consumed += 1
+                lag = time.monotonic() - enq
+                st.lag_last = lag
+                st.lag_total += lag
+                if lag > st.lag_max:
+                    st.lag_max = lag
+                self._cond.notify_all()
+            yield picked, item
+
+    def idle(self) -> bool:
+        """True when no source has anything queued for the consumer."""
+        return not any(self._queues.values())
+
+    def stats(self) -> dict[str, dict]:
+        with self._cond:
+            return {name: st.as_dict() for name, st in self._stats.items()}
+
+    def drain(self) -> Iterator[tuple[str, Any]]:
+        """Yield what is still queued, without waiting; use after ``close()``."""
+        for name, q in self._queues.items():
+            st = self._stats[name]
+            while True:
+                with self._cond:
+                    if not q:
+                        break
+                    _, item = q.popleft()
+                    st.consumed += 1
+                yield name, item
+
+    def close(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        # producers blocked inside a tailer wake within its 1s inotify/poll cycle
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            if t.is_alive():
+                t.join(max(0.0, deadline - time.monotonic()))
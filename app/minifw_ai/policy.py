@@ -1,4 +1,5 @@
 from __future__ import annotations
+import ipaddress
 import json
 from dataclasses import dataclass
 from pathlib import Path
@@ -13,6 +14,32 @@ class Policy:
         self.path = Path(path)
         self.cfg = json.loads(self.path.read_text(encoding="utf-8"))
 
+    def validate(self) -> None:
+        """Raise ValueError if the config cannot drive the engine."""
+        if not isinstance(self.cfg, dict):
+            raise ValueError("policy must be a JSON object")
+        for name, seg in self.cfg.get("segments", {}).items():
+            try:
+                block, monitor = int(seg["block_threshold"]), int(seg["monitor_threshold"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"segment '{name}' needs integer block_threshold and monitor_threshold")
+            if not (0 <= monitor <= 100 and 0 <= block <= 100):
+                raise ValueError(f"segment '{name}' thresholds must be between 0 and 100")
+        for name, cidrs in self.segment_subnets().items():
+            if not isinstance(cidrs, list):
+                raise ValueError(f"segment_subnets['{name}'] must be a list")
+            for c in cidrs:
+                try:
+                    ipaddress.ip_network(c, strict=False)
+                except (TypeError, ValueError):
+                    raise ValueError(f"invalid subnet {c!r} for segment '{name}'")
+        for section in ("features", "burst"):
+            for key, val in self.cfg.get(section, {}).items():
+                try:
+                    float(val)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{section}.{key} must be numeric")
+
     def thresholds(self, segment: str) -> SegmentThreshold:
         segs = self.cfg.get("segments", {})
         seg = segs.get(segment) or segs.get("default") or {"block_threshold": 60, "monitor_threshold": 40}
@@ -32,3 +59,15 @@ class Policy:
 
     def burst(self) -> dict:
         return self.cfg.get("burst", {})
+
+    def events(self) -> dict:
+        return self.cfg.get("events", {})
+
+    def cache(self) -> dict:
+        return self.cfg.get("cache", {})
+
+    def engine(self) -> dict:
+        return self.cfg.get("engine", {})
+
+    def metrics(self) -> dict:
+        return self.cfg.get("metrics", {})
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from array import array
+from pathlib import Path
+
+from minifw_ai.collector_dnsmasq import parse_dnsmasq
+from minifw_ai.collector_zeek import ZeekSSLParser
+from minifw_ai.events import EventWriter, event_log_path
+from minifw_ai.main import Scorer
+from minifw_ai.metrics import STAGE_SECONDS
+from minifw_ai.pipeline import EventMux
+from minifw_ai.state import StateReloader
+
+class RecordingEnforcer:
+    """Stands in for BatchEnforcer: counts (and optionally keeps) block decisions."""
+
+    def __init__(self, record: bool = True):
+        self.record = record
+        self.blocked: set[str] = set()
+        self.requested = 0
+
+    def add(self, ip: str, timeout: int | None = None) -> None:
+        self.requested += 1
+        if self.record:
+            self.blocked.add(ip)
+
+    def stats(self) -> dict:
+        return {"requested": self.requested, "unique_blocked": len(self.blocked)}
+
+    def close(self) -> None:
+        pass
+
+def read_lines(path: Path, block_size: int = 1024 * 1024):
+    """Read a whole log from the start in large blocks (no tailing)."""
+    with path.open("rb") as f:
+        partial = b""
+        while True:
+            chunk = f.read(block_size)
+            if not chunk:
+                break
+            lines = (partial + chunk).split(b"\n")
+            partial = lines.pop()
+            for raw in lines:
+                yield raw.decode("utf-8", errors="replace")
+        if partial:
+            yield partial.decode("utf-8", errors="replace")
+
+def _dns_source(path: Path, limit: int | None):
+    n = 0
+    timer = STAGE_SECONDS.labels("parse")
+    perf = time.perf_counter
+    for ln in read_lines(path):
+        t0 = perf()
+        evt = parse_dnsmasq(ln)
+        timer.observe(perf() - t0)
+        if evt:
+            yield evt
+            n += 1
+            if limit is not None and n >= limit:
+                return
+
+def _zeek_source(path: Path):
+    parser = ZeekSSLParser()
+    timer = STAGE_SECONDS.labels("parse_sni")
+    perf = time.perf_counter
+    for ln in read_lines(path):
+        t0 = perf()
+        evt = parser.parse(ln)
+        timer.observe(perf() - t0)
+        if evt:
+            yield evt
+
+def _percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+def replay(dns_log: str, zeek_log: str | None, policy_path: str, feeds_dir: str, out_path: str,
+           enforcer: str = "record", limit: int | None = None) -> dict:
+    """Run recorded logs through the scoring pipeline as fast as possible.
+
+    Uses the same EventMux, Scorer, verdict cache and EventWriter as
+    ``main.run``; only the kernel enforcer is replaced. Burst detection runs
+    on wall-clock time, so replayed traffic looks burstier than it was.
+    """
+    reloader = StateReloader(policy_path, feeds_dir)
+    pol = reloader.state.policy
+    out_path = event_log_path(out_path, str(pol.events().get("format", "jsonl")))
+    writer = EventWriter.from_policy(out_path, pol.events())
+    enf = RecordingEnforcer(record=(enforcer == "record"))
+    scorer = Scorer(pol, reloader, enf, writer)
+
+    mux = EventMux(queue_size=int(pol.collectors().get("queue_size", 10000)))
+    mux.add_source("dnsmasq", _dns_source(Path(dns_log), limit))
+    if zeek_log:
+        mux.add_source("zeek", _zeek_source(Path(zeek_log)))
+
+    latencies = array("d")
+    counts = {"dnsmasq": 0, "zeek": 0}
+    perf = time.perf_counter
+    t_start = perf()
+    try:
+        mux.start()
+        for source, (client_ip, domain) in mux:
+            t0 = perf()
+            scorer.handle(source, client_ip, domain)
+            if source == "dnsmasq":
+                latencies.append(perf() - t0)
+            counts[source] = counts.get(source, 0) + 1
+    finally:
+        mux.close()
+        writer.close()
+    elapsed = perf() - t_start
+
+    lat = sorted(latencies)
+    stages = {}
+    for stage, (count, total) in STAGE_SECONDS.totals().items():
+        stages[stage] = {"count": count, "seconds": total,
+                         "share": (total / elapsed) if elapsed else 0.0}
+    dns_events = counts.get("dnsmasq", 0)
+    return {
+        "dns_events": dns_events,
+        "sni_events": counts.get("zeek", 0),
+        "elapsed_seconds": elapsed,
+        "events_per_second": dns_events / elapsed if elapsed else 0.0,
+        "latency_p50_us": _percentile(lat, 0.50) * 1e6,
+        "latency_p99_us": _percentile(lat, 0.99) * 1e6,
+        "latency_max_us": (lat[-1] if lat else 0.0) * 1e6,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "stages": stages,
+        "enforcer": enf.stats(),
+        "verdict_cache": scorer.verdicts.stats(),
+        "event_log": out_path,
+        "event_log_bytes": writer.bytes_written,
+    }
+
+def _print_report(r: dict) -> None:
+    print(f"DNS events       {r['dns_events']:>12,}")
+    print(f"SNI events       {r['sni_events']:>12,}")
+    print(f"Elapsed          {r['elapsed_seconds']:>12.3f} s")
+    print(f"Throughput       {r['events_per_second']:>12,.0f} events/s")
+    print(f"Latency p50      {r['latency_p50_us']:>12.1f} us")
+    print(f"Latency p99      {r['latency_p99_us']:>12.1f} us")
+    print(f"Latency max      {r['latency_max_us']:>12.1f} us")
+    print(f"Peak RSS         {r['peak_rss_mb']:>12.1f} MiB")
+    print(f"Blocks requested {r['enforcer']['requested']:>12,}")
+    print(f"Event log        {r['event_log_bytes']:>12,} bytes -> {r['event_log']}")
+    print("Stage breakdown:")
+    # parse runs on the source threads, concurrently with the scoring stages
+    for stage, s in sorted(r["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+        print(f"  {stage:<12} {s['seconds']:>10.3f} s  {s['share'] * 100:>5.1f}%  ({s['count']:,} calls)")
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m minifw_ai replay",
+                                 description="Replay recorded logs through the MiniFW-AI pipeline and report throughput.")
+    ap.add_argument("dnsmasq_log", help="recorded dnsmasq query log")
+    ap.add_argument("--zeek", help="recorded Zeek ssl.log (TSV or JSON)")
+    ap.add_argument("--policy", default=os.environ.get("MINIFW_POLICY", "/opt/minifw_ai/config/policy.json"))
+    ap.add_argument("--feeds", default=os.environ.get("MINIFW_FEEDS", "/opt/minifw_ai/config/feeds"))
+    ap.add_argument("--out", help="event log to write (default: a temporary file, removed afterwards)")
+    ap.add_argument("--enforcer", choices=("record", "noop"), default="record")
+    ap.add_argument("--limit", type=int, help="stop after this many DNS events")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    tmpdir = None
+    out = args.out
+    if out is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix="minifw-replay-")
+        out = str(Path(tmpdir.name) / "events.jsonl")
+    try:
+        report = replay(args.dnsmasq_log, args.zeek, args.policy, args.feeds, out,
+                        enforcer=args.enforcer, limit=args.limit)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        _print_report(report)
+    return 0
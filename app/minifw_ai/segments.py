@@ -0,0 +1,268 @@
+from __future__ import annotations
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .events import COMPRESSED_SUFFIXES, log_format, read_events_from, read_last_events
+
+# stdlib only (zstd optional): also imported by the web app as app.minifw_ai.segments
+
+ROTATE_MODES = ("none", "hourly")
+COMPRESSIONS = ("none", "gzip", "zstd")
+MANIFEST = "manifest.json"
+
+def segments_dir(log_path: Path) -> Path:
+    """``logs/events.jsonl`` keeps its closed segments in ``logs/events.jsonl.segments/``.
+
+    Keyed by the full name so ``events.jsonl`` and ``events.bin`` (after a
+    format switch) never share a manifest.
+    """
+    p = Path(log_path)
+    return p.with_name(f"{p.name}.segments")
+
+def load_manifest(log_path: Path) -> list[dict]:
+    """Closed segments of a log, oldest first; empty if it was never rotated."""
+    try:
+        with (segments_dir(log_path) / MANIFEST).open("r", encoding="utf-8") as f:
+            return list(json.load(f).get("segments", []))
+    except (OSError, ValueError):
+        return []
+
+def _save_manifest(log_path: Path, segments: list[dict]) -> None:
+    path = segments_dir(log_path) / MANIFEST
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump({"log": Path(log_path).name, "segments": segments}, f, indent=1)
+    os.replace(tmp, path)
+
+def segment_path(log_path: Path, entry: dict) -> Path:
+    """Current file of a segment; falls back to the compressed name if the
+    manifest we read predates the compression finishing."""
+    d = segments_dir(log_path)
+    path = d / entry["file"]
+    if not path.exists():
+        for suffix in COMPRESSED_SUFFIXES:
+            alt = d / (entry["id"] + suffix)
+            if alt.exists():
+                return alt
+    return path
+
+def _event_epoch(ev: dict) -> float | None:
+    try:
+        return datetime.fromisoformat(str(ev.get("ts", ""))).timestamp()
+    except ValueError:
+        return None
+
+def _compress(src: Path, method: str) -> Path:
+    if method == "zstd":
+        import zstandard
+        dst = src.with_name(src.name + ".zst")
+        with src.open("rb") as fin, open(dst.with_name(dst.name + ".tmp"), "wb") as fout:
+            zstandard.ZstdCompressor(level=3).copy_stream(fin, fout)
+    else:
+        dst = src.with_name(src.name + ".gz")
+        with src.open("rb") as fin, gzip.open(dst.with_name(dst.name + ".tmp"), "wb", compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+    os.replace(dst.with_name(dst.name + ".tmp"), dst)
+    # retention may have dropped the segment while it was being compressed
+    src.unlink(missing_ok=True)
+    return dst
+
+class SegmentLog:
+    """Rotation, compression and retention for one ``EventWriter`` log.
+
+    The live log keeps its name, so tailers and readers never chase it.
+    On rotation (top of the hour and/or ``max_bytes``) it is renamed into
+    ``<name>.segments/`` together with its ``.dict`` for binary logs,
+    recorded in ``manifest.json`` with its time range, logical byte
+    offset, size, inode and per-action counts, and compressed in a
+    background thread. Retention drops the oldest segments by age and by
+    total size. ``EventWriter`` calls ``note`` per event and ``rotate``
+    under its own lock.
+    """
+
+    def __init__(self, log_path: Path, rotate: str = "hourly", max_bytes: int = 0, compress: str = "gzip",
+                 retention_days: float = 0, retention_max_bytes: int = 0):
+        if rotate not in ROTATE_MODES:
+            raise ValueError(f"rotate must be one of {ROTATE_MODES}, got {rotate!r}")
+        if compress not in COMPRESSIONS:
+            raise ValueError(f"compress must be one of {COMPRESSIONS}, got {compress!r}")
+        if compress == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                print("[minifw] zstandard not installed, compressing event segments with gzip")
+                compress = "gzip"
+        self.log_path = Path(log_path)
+        self.dir = segments_dir(self.log_path)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.rotate_mode = rotate
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.retention_seconds = retention_days * 86400
+        self.retention_max_bytes = retention_max_bytes
+        self.rotations = 0
+        self.segments = load_manifest(self.log_path)
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._reset_current()
+        self._scan_live()
+        # finish compressing anything a previous run left behind
+        for entry in self.segments:
+            if entry.get("compression") == "none" and self.compress != "none":
+                self._compress_later(entry)
+
+    def _reset_current(self) -> None:
+        self.start: float | None = None
+        self.end: float | None = None
+        self.events = 0
+        self.raw_bytes = 0
+        self.actions: dict[str, int] = {}
+        now = time.time()
+        self.rotate_at = (now // 3600 + 1) * 3600 if self.rotate_mode == "hourly" else float("inf")
+
+    def _scan_live(self) -> None:
+        """Count what is already in the live log (restart mid-segment)."""
+        if not self.log_path.exists() or self.log_path.stat().st_size == 0:
+            return
+        for ev, end in read_events_from(self.log_path):
+            t = _event_epoch(ev)
+            if t is not None:
+                self.start = t if self.start is None else min(self.start, t)
+                self.end = t if self.end is None else max(self.end, t)
+            self.events += 1
+            action = str(ev.get("action", "unknown"))
+            self.actions[action] = self.actions.get(action, 0) + 1
+        self.raw_bytes = self.log_path.stat().st_size
+        if self.start is not None and self.rotate_mode == "hourly":
+            self.rotate_at = (self.start // 3600 + 1) * 3600
+
+    def note(self, action: str, size: int, now: float) -> None:
+        if self.start is None:
+            self.start = now
+        self.end = now
+        self.events += 1
+        self.raw_bytes += size
+        self.actions[action] = self.actions.get(action, 0) + 1
+
+    def due(self, now: float) -> bool:
+        return self.events > 0 and (now >= self.rotate_at or (self.max_bytes > 0 and self.raw_bytes >= self.max_bytes))
+
+    def rotate(self) -> dict:
+        """Move the (closed) live log into the segment directory; the caller reopens it."""
+        src = self.log_path
+        stamp = datetime.fromtimestamp(self.start or time.time(), timezone.utc).strftime("%Y%m%dT%H%M%S")
+        with self._lock:
+            seq = (self.segments[-1].get("seq", 0) + 1) if self.segments else 1
+            name = f"{src.stem}-{stamp}-{seq:06d}{src.suffix}"
+            offset = (self.segments[-1]["offset"] + self.segments[-1]["raw_bytes"]) if self.segments else 0
+            st = src.stat()
+            os.replace(src, self.dir / name)
+            fmt = log_format(src)
+            if fmt == "binary":
+                os.replace(Path(str(src) + ".dict"), self.dir / f"{name}.dict")
+            entry = {
+                "id": name,
+                "seq": seq,
+                "file": name,
+                "format": fmt,
+                "compression": "none",
+                "start": self.start,
+                "end": self.end,
+                "events": self.events,
+                "actions": dict(self.actions),
+                "offset": offset,
+                "raw_bytes": st.st_size,
+                "bytes": st.st_size,
+                "inode": st.st_ino,
+            }
+            self.segments.append(entry)
+            self._apply_retention()
+            _save_manifest(self.log_path, self.segments)
+        self.rotations += 1
+        self._reset_current()
+        if self.compress != "none":
+            self._compress_later(entry)
+        return entry
+
+    def _compress_later(self, entry: dict) -> None:
+        t = threading.Thread(target=self._compress_entry, args=(entry,), name="minifw-segment-compress", daemon=True)
+        self._threads = [x for x in self._threads if x.is_alive()] + [t]
+        t.start()
+
+    def _compress_entry(self, entry: dict) -> None:
+        with self._lock:
+            if entry not in self.segments:
+                return
+            src = self.dir / entry["file"]
+        try:
+            dst = _compress(src, self.compress)
+        except (OSError, ImportError) as e:
+            if entry in self.segments:
+                print(f"[minifw] compressing {src} failed: {e}")
+            for suffix in COMPRESSED_SUFFIXES:
+                src.with_name(src.name + suffix + ".tmp").unlink(missing_ok=True)
+            return
+        with self._lock:
+            if entry not in self.segments:
+                # dropped by retention meanwhile, possibly before dst existed
+                dst.unlink(missing_ok=True)
+                return
+            entry["file"] = dst.name
+            entry["compression"] = self.compress
+            entry["bytes"] = dst.stat().st_size
+            _save_manifest(self.log_path, self.segments)
+
+    def _apply_retention(self, now: float | None = None) -> None:
+        # caller holds self._lock
+        now = time.time() if now is None else now
+        keep = list(self.segments)
+        if self.retention_seconds > 0:
+            keep = [e for e in keep if (e.get("end") or 0) >= now - self.retention_seconds]
+        if self.retention_max_bytes > 0:
+            total = sum(e["bytes"] for e in keep)
+            # never drop the segment just closed
+            while len(keep) > 1 and total > self.retention_max_bytes:
+                total -= keep.pop(0)["bytes"]
+        dropped = [e for e in self.segments if e not in keep]
+        for e in dropped:
+            for name in (e["file"], e["id"], f"{e['id']}.dict", *(e["id"] + x for x in COMPRESSED_SUFFIXES)):
+                try:
+                    (self.dir / name).unlink()
+                except FileNotFoundError:
+                    pass
+        self.segments = keep
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "segments": len(self.segments),
+                "segment_bytes": sum(e["bytes"] for e in self.segments),
+                "rotations": self.rotations,
+                "live_events": self.events,
+            }
+
+    def close(self) -> None:
+        for t in self._threads:
+            t.join()
+
+def read_recent(log_path: Path, n: int) -> list[dict]:
+    """Last ``n`` events, newest first, continuing into the newest segments if needed."""
+    out: list[dict] = read_last_events(log_path, n) if Path(log_path).exists() else []
+    for entry in reversed(load_manifest(log_path)):
+        if len(out) >= n:
+            break
+        try:
+            out.extend(read_last_events(segment_path(log_path, entry), n - len(out)))
+        except FileNotFoundError:
+            continue
+    return out
+
+def segment_files(log_path: Path) -> list[tuple[dict, Path]]:
+    """``(manifest entry, current file)`` for each closed segment, oldest first."""
+    return [(e, segment_path(log_path, e)) for e in load_manifest(log_path)]
@@ -0,0 +1,170 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from minifw_ai.policy import Policy, SegmentThreshold
+from minifw_ai.feeds import FeedMatcher
+from minifw_ai.netutil import SubnetTable
+
+FEED_FILES = ("deny_domains.txt", "allow_domains.txt", "deny_ips.txt", "deny_asn.txt")
+
+@dataclass(frozen=True)
+class EngineState:
+    """Everything the scoring loop reads from policy and feeds, compiled."""
+    generation: int
+    policy: Policy
+    feeds: FeedMatcher
+    segments: SubnetTable
+    weights: dict
+    monitor_qpm: int
+    block_qpm: int
+
+def build_state(policy_path: str, feeds_dir: str, generation: int = 0) -> EngineState:
+    pol = Policy(policy_path)
+    pol.validate()
+    burst_cfg = pol.burst()
+    return EngineState(
+        generation=generation,
+        policy=pol,
+        feeds=FeedMatcher(feeds_dir),
+        segments=SubnetTable(pol.segment_subnets()),
+        weights=pol.features(),
+        monitor_qpm=int(burst_cfg.get("dns_queries_per_minute_monitor", 120)),
+        block_qpm=int(burst_cfg.get("dns_queries_per_minute_block", 240)),
+    )
+
+class StateReloader:
+    """Watches policy.json and the feed files and rebuilds EngineState.
+
+    Rebuilding (JSON parse, validation, matcher and subnet table compile)
+    runs on a background thread; the result is published by a single
+    reference assignment, so the scoring loop sees either the old or the
+    new state, never a mix. A config that fails to load or validate is
+    rejected and the current state stays in place.
+
+    Enforcement and collector settings are only read at startup.
+    """
+
+    def __init__(self, policy_path: str, feeds_dir: str, interval: float = 2.0):
+        self.policy_path = policy_path
+        self.feeds_dir = feeds_dir
+        self.interval = interval
+        self._sig = self._signature()
+        self.state = build_state(policy_path, feeds_dir)
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.last_reload_seconds = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch_loop, name="minifw-reload", daemon=True)
+
+    def _signature(self) -> tuple:
+        sig = []
+        for p in [Path(self.policy_path)] + [Path(self.feeds_dir) / n for n in FEED_FILES]:
+            try:
+                st = p.stat()
+                sig.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def request(self) -> None:
+        """Force a reload on the next watcher pass (e.g. from SIGHUP)."""
+        self._sig = None
+        self._wake.set()
+
+    def reload(self) -> bool:
+        t0 = time.perf_counter()
+        try:
+            new = build_state(self.policy_path, self.feeds_dir, self.state.generation + 1)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[minifw] policy/feeds reload rejected, keeping generation "
+                  f"{self.state.generation}: {self.last_error}", flush=True)
+            return False
+        self.state = new
+        self.reloads += 1
+        self.last_error = None
+        self.last_reload_seconds = time.perf_counter() - t0
+        return True
+
+    def _watch_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            # snapshot before reading, so a write that lands mid-reload triggers another pass
+            sig = self._signature()
+            if sig != self._sig:
+                self._sig = sig
+                self.reload()
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.state.generation,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload_seconds": self.last_reload_seconds,
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+class VerdictCache:
+    """Bounded LRU of the static part of a decision, keyed by (segment, domain).
+
+    Caches the segment thresholds and the allow/deny feed verdict for a
+    domain. Entries expire after ``ttl_seconds`` and the whole cache is
+    dropped when the EngineState generation changes, so a reload never
+    serves verdicts from the old feeds.
+    """
+
+    def __init__(self, max_entries: int = 50000, ttl_seconds: float = 300.0):
+        self.max_entries = max(int(max_entries), 1)
+        self.ttl = float(ttl_seconds)
+        self.generation = -1
+        self._d: OrderedDict[tuple[str, str], tuple[float, SegmentThreshold, bool]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, st: EngineState, segment: str, domain: str) -> tuple[SegmentThreshold, bool]:
+        if st.generation != self.generation:
+            self._d.clear()
+            self.generation = st.generation
+        now = time.monotonic()
+        key = (segment, domain)
+        e = self._d.get(key)
+        if e is not None and e[0] > now:
+            self.hits += 1
+            self._d.move_to_end(key)
+            return e[1], e[2]
+        self.misses += 1
+        thr = st.policy.thresholds(segment)
+        denied = (not st.feeds.domain_allowed(domain)) and st.feeds.domain_denied(domain)
+        self._d[key] = (now + self.ttl, thr, denied)
+        self._d.move_to_end(key)
+        if len(self._d) > self.max_entries:
+            self._d.popitem(last=False)
+            self.evictions += 1
+        return thr, denied
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._d),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "generation": self.generation,
+        }
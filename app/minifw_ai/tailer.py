@@ -0,0 +1,226 @@
+from __future__ import annotations
+import ctypes
+import json
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Iterator
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+POLL_INTERVAL = 0.2
+
+class InotifyWatch:
+    """Minimal ctypes binding to inotify for a single file.
+
+    ``wait()`` blocks until the file is modified, moved or deleted (or the
+    timeout passes) and returns the event mask seen, 0 on timeout.
+    """
+
+    _libc = None
+
+    def __init__(self, path: Path, mask: int = IN_MODIFY | IN_ATTRIB | IN_MOVE_SELF | IN_DELETE_SELF):
+        libc = self._load_libc()
+        self.fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+
+    @classmethod
+    def _load_libc(cls):
+        if cls._libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            cls._libc = libc
+        return cls._libc
+
+    def wait(self, timeout: float | None = None) -> int:
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        if not r:
+            return 0
+        mask = 0
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return 0
+        off = 0
+        # struct inotify_event { int wd; uint32 mask, cookie, len; char name[]; }
+        while off + 16 <= len(buf):
+            _, m, _, name_len = struct.unpack_from("iIII", buf, off)
+            mask |= m
+            off += 16 + name_len
+        return mask
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+def open_watch(path: Path) -> InotifyWatch | None:
+    try:
+        return InotifyWatch(path)
+    except (OSError, AttributeError):
+        # not Linux, no libc symbol, or out of watches: fall back to polling
+        return None
+
+class FileTailer:
+    """Rotation-safe follower of an append-only log file.
+
+    Tracks the inode and byte offset of the last line handed out and, if
+    ``checkpoint_path`` is given, persists them so a restart resumes where
+    the previous run stopped (including the tail of the file logrotate
+    renamed to ``<name>.1`` meanwhile). Without a checkpoint it starts at
+    EOF like ``tail -f``.
+
+    Reads are done in large blocks and the tailer only sleeps at EOF, so a
+    backlog is drained at full speed before switching to live tailing.
+    Rename and truncation are detected at EOF; the old file is drained
+    before the new one is opened.
+    """
+
+    def __init__(self, path: Path, checkpoint_path: Path | None = None, use_inotify: bool = True,
+                 block_size: int = 1024 * 1024, checkpoint_interval: float = 1.0):
+        self.path = Path(path)
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.use_inotify = use_inotify
+        self.block_size = block_size
+        self.checkpoint_interval = checkpoint_interval
+        self.inode = 0
+        self.offset = 0
+        self.rotations = 0
+        self._saved: tuple[int, int] | None = None
+        self._last_cp = 0.0
+
+    def _load_checkpoint(self) -> tuple[int, int] | None:
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return None
+        try:
+            cp = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+            return int(cp["inode"]), int(cp["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save_checkpoint(self) -> None:
+        if self.checkpoint_path is None:
+            return
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.checkpoint_path.with_suffix(self.checkpoint_path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"path": str(self.path), "inode": self.inode, "offset": self.offset}),
+                       encoding="utf-8")
+        os.replace(tmp, self.checkpoint_path)
+        self._saved = (self.inode, self.offset)
+        self._last_cp = time.monotonic()
+
+    def _checkpoint(self, force: bool = False) -> None:
+        """Save if the position moved and ``checkpoint_interval`` has passed (or ``force``)."""
+        if (self.inode, self.offset) == self._saved:
+            return
+        if force or time.monotonic() - self._last_cp >= self.checkpoint_interval:
+            self.save_checkpoint()
+
+    def _open_start(self):
+        """Pick the file and offset to start from, honouring the checkpoint."""
+        st = self.path.stat()
+        cp = self._load_checkpoint()
+        if cp is None:
+            return None, self.path.open("rb"), st.st_size
+        inode, offset = cp
+        if inode == st.st_ino:
+            return None, self.path.open("rb"), offset if offset <= st.st_size else 0
+        rotated = self.path.with_name(self.path.name + ".1")
+        try:
+            if rotated.stat().st_ino == inode:
+                # backlog left in the rotated file, then the new file from the start
+                return (rotated.open("rb"), offset), self.path.open("rb"), 0
+        except OSError:
+            pass
+        return None, self.path.open("rb"), 0
+
+    def _read_lines(self, f) -> Iterator[str]:
+        """Yield complete lines from ``f`` until EOF, advancing ``self.offset``."""
+        partial = b""
+        while True:
+            chunk = f.read(self.block_size)
+            if not chunk:
+                break
+            lines = (partial + chunk).split(b"\n")
+            partial = lines.pop()
+            for raw in lines:
+                # a line counts as consumed once handed out, so a restart never replays it
+                self.offset += len(raw) + 1
+                yield raw.decode("utf-8", errors="replace")
+                self._checkpoint()
+        # leave an incomplete last line in the file for the next pass
+        if partial:
+            f.seek(self.offset)
+
+    def _drain_rotated(self, f, offset: int) -> Iterator[str]:
+        self.inode = os.fstat(f.fileno()).st_ino
+        self.offset = offset
+        f.seek(offset)
+        try:
+            yield from self._read_lines(f)
+        finally:
+            f.close()
+
+    def lines(self) -> Iterator[str]:
+        rotated, f, offset = self._open_start()
+        watch = None
+        try:
+            if rotated is not None:
+                yield from self._drain_rotated(*rotated)
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.offset = offset
+            f.seek(offset)
+            watch = open_watch(self.path) if self.use_inotify else None
+            while True:
+                yield from self._read_lines(f)
+                # at most once per checkpoint_interval, even when every write wakes us
+                self._checkpoint()
+                try:
+                    st = self.path.stat()
+                except FileNotFoundError:
+                    st = None
+                if st is not None and st.st_ino != self.inode:
+                    # renamed away: old file is fully drained above, switch to the new one
+                    f.close()
+                    f = self.path.open("rb")
+                    self.inode, self.offset = st.st_ino, 0
+                    self.rotations += 1
+                    if watch is not None:
+                        watch.close()
+                    watch = open_watch(self.path) if self.use_inotify else None
+                    continue
+                if st is not None and st.st_size < self.offset:
+                    # truncated in place (copytruncate)
+                    f.seek(0)
+                    self.offset = 0
+                    self.rotations += 1
+                    continue
+                if watch is not None and st is not None:
+                    # the timeout is only a safety net against missed events
+                    watch.wait(1.0)
+                else:
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            self._checkpoint(force=True)
+            f.close()
+            if watch is not None:
+                watch.close()
+
+def tail_lines(path: Path, use_inotify: bool = True, checkpoint_path: Path | None = None) -> Iterator[str]:
+    """Follow ``path``, yielding lines without "\\n" (see ``FileTailer``)."""
+    return FileTailer(path, checkpoint_path=checkpoint_path, use_inotify=use_inotify).lines()
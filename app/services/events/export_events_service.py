@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.minifw_ai.columnar import export_dir, export_segments, resolve_format
+from app.services.events.get_events_service import _event_files
+
+_export_lock = threading.Lock()
+_export_thread = None
+_export_status: Dict[str, Any] = {"running": False}
+
+
+def start_events_export(fmt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Start converting closed event log segments to a columnar format in
+    a background thread; segments already exported are skipped, so an
+    interrupted export resumes where it stopped
+
+    Args:
+        fmt: parquet, mfwcol or auto (parquet when pyarrow is installed)
+
+    Returns:
+        Export status (see get_events_export_status); a running export
+        is left alone and its status returned
+    """
+    global _export_thread
+    fmt = resolve_format(fmt or "auto")
+    with _export_lock:
+        if _export_status["running"]:
+            return dict(_export_status)
+        _export_status.clear()
+        _export_status.update({
+            "running": True,
+            "format": fmt,
+            "started": time.time(),
+            "finished": None,
+            "current_log": None,
+            "segments": 0,
+            "rows": 0,
+            "skipped": 0,
+            "outputs": [],
+            "error": None,
+        })
+        _export_thread = threading.Thread(target=_run_export, args=(fmt,), name="minifw-events-export",
+                                          daemon=True)
+        _export_thread.start()
+        return dict(_export_status)
+
+
+def _run_export(fmt: str):
+    def on_segment(seg_id, rows):
+        with _export_lock:
+            _export_status["segments"] += 1
+            _export_status["rows"] += rows
+
+    try:
+        for log in _event_files():
+            with _export_lock:
+                _export_status["current_log"] = log.name
+            summary = export_segments(log, fmt=fmt, on_segment=on_segment)
+            with _export_lock:
+                _export_status["skipped"] += summary["skipped"]
+                _export_status["outputs"].append(str(export_dir(log)))
+    except Exception as e:
+        with _export_lock:
+            _export_status["error"] = str(e)
+    finally:
+        with _export_lock:
+            _export_status["running"] = False
+            _export_status["current_log"] = None
+            _export_status["finished"] = time.time()
+
+
+def get_events_export_status() -> Dict[str, Any]:
+    """
+    Progress of the current or last columnar export
+
+    Returns:
+        Dict with running, format, started/finished (epoch seconds),
+        segments and rows exported so far, skipped (already exported),
+        outputs (export directories) and error
+    """
+    with _export_lock:
+        return dict(_export_status, outputs=list(_export_status.get("outputs", [])))
@@ -1,4 +1,41 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import base64
+import json
+import re
+
+
+# DataTables column index -> SQL ORDER BY on the raw event fields
+# (0=time, 1=type, 2=source, 3=status); every order matches an index of
+# the event store, status included, so no sort ever builds a temp B-tree
+ORDER_COLUMNS = {
+    0: ("ts",),
+    1: ("action", "reasons"),
+    2: ("domain", "client_ip"),
+    3: ("action", "reasons"),
+}
+
+MAX_PAGE_LENGTH = 1000
+
+TIME_PREFIX = re.compile(r"^\d{4}(-\d{0,2}){0,2}([ T][\d:]*)?$")
+
+# Type column label -> SQL condition, mirroring _determine_event_type
+# (checked in the same order: ip, domain, asn, burst/rate)
+_HAS_REASONS = "reasons != '[]'"
+_IP = "lower(reasons) LIKE '%ip%'"
+_DOMAIN = "lower(reasons) LIKE '%domain%'"
+_ASN = "lower(reasons) LIKE '%asn%'"
+_RATE = "(lower(reasons) LIKE '%burst%' OR lower(reasons) LIKE '%rate%')"
+TYPE_CONDITIONS = {
+    "ip block": f"{_HAS_REASONS} AND {_IP}",
+    "domain block": f"{_HAS_REASONS} AND NOT {_IP} AND {_DOMAIN}",
+    "asn block": f"{_HAS_REASONS} AND NOT {_IP} AND NOT {_DOMAIN} AND {_ASN}",
+    "rate limit": f"{_HAS_REASONS} AND NOT {_IP} AND NOT {_DOMAIN} AND NOT {_ASN} AND {_RATE}",
+    "security block": f"{_HAS_REASONS} AND NOT {_IP} AND NOT {_DOMAIN} AND NOT {_ASN} AND NOT {_RATE}",
+    "domain allow": "reasons = '[]' AND action = 'allow' AND domain != ''",
+    "traffic allow": "reasons = '[]' AND action = 'allow' AND domain = ''",
+    "traffic block": "reasons = '[]' AND action IN ('block', 'deny')",
+    "unknown": "reasons = '[]' AND action NOT IN ('allow', 'block', 'deny')",
+}
 
 
 def get_events_datatable(
@@ -7,11 +44,17 @@ def get_events_datatable(
     length: int = 10,
     search_value: str = "",
     order_column: int = 0,
-    order_dir: str = "desc"
+    order_dir: str = "desc",
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Get events with DataTables server-side processing
     
+    Filtering, sorting and paging run as SQL on the raw fields of the
+    indexed event store, and only the returned page goes through
+    _format_event. The response carries `next_cursor`; sending it back
+    as `cursor` fetches the following page by keyset instead of OFFSET.
+    
     Args:
         draw: DataTables draw counter
         start: Starting record index
@@ -19,40 +62,118 @@ def get_events_datatable(
         search_value: Search keyword
         order_column: Column index to sort by
         order_dir: Sort direction (asc/desc)
+        cursor: `next_cursor` of the previous page (optional)
     
     Returns:
         Dict with DataTables response format
     """
-    from app.services.events.get_events_service import get_recent_events
-    
-    # Get all events
-    all_events = get_recent_events(limit=10000)
-    
-    # Filter events based on search
-    if search_value:
-        filtered_events = _filter_events(all_events, search_value)
-    else:
-        filtered_events = all_events
-    
-    # Get total counts
-    total_records = len(all_events)
-    filtered_records = len(filtered_events)
-    
-    # Sort events
-    sorted_events = _sort_events(filtered_events, order_column, order_dir)
-    
-    # Paginate
-    paginated_events = sorted_events[start:start + length]
+    from app.services.events.get_events_service import (
+        _event_files, _format_event, _get_sample_events, get_event_store
+    )
+    
+    if not _event_files():
+        # No log yet: page through the sample data like before
+        sample = _filter_events(_get_sample_events(), search_value) if search_value else _get_sample_events()
+        return {
+            "draw": draw,
+            "recordsTotal": len(_get_sample_events()),
+            "recordsFiltered": len(sample),
+            "data": sample[start:start + length]
+        }
+    
+    store = get_event_store()
+    
+    where, params = _search_clause(store, search_value)
+    total_records = store.count()
+    filtered_records = store.count(where, params) if where else total_records
+    
+    descending = str(order_dir).lower() != "asc"
+    order = ORDER_COLUMNS.get(order_column, ORDER_COLUMNS[0])
+    
+    if length is None or length <= 0:
+        length = MAX_PAGE_LENGTH
+    try:
+        after = _decode_cursor(cursor, order_column)
+        rows, last = store.page(where, params, order=order, descending=descending,
+                                limit=min(length, MAX_PAGE_LENGTH), offset=max(start, 0), after=after)
+    except ValueError:
+        # stale or foreign cursor (e.g. the sort order changed): fall back to offset paging
+        rows, last = store.page(where, params, order=order, descending=descending,
+                                limit=min(length, MAX_PAGE_LENGTH), offset=max(start, 0))
     
     # Return DataTables format
     return {
         "draw": draw,
         "recordsTotal": total_records,
         "recordsFiltered": filtered_records,
-        "data": paginated_events
+        "data": [_format_event(row) for row in rows],
+        "next_cursor": _encode_cursor(order_column, last) if last else None
     }
 
 
+def _encode_cursor(order_column: int, key: tuple) -> str:
+    """Opaque keyset cursor: sort column plus the last row's sort key"""
+    raw = json.dumps([order_column, list(key)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: Optional[str], order_column: int):
+    if not cursor:
+        return None
+    try:
+        column, key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+    if column != order_column:
+        raise ValueError("cursor belongs to another sort order")
+    return tuple(key)
+
+
+def _search_clause(store, search_value: str):
+    """
+    WHERE condition matching the search box against the fields the table
+    shows: source (domain/ip) through the store's trigram index, the raw
+    reasons through the known reason names containing the text, status/
+    action by equality, time by prefix, and the type column by the label
+    it displays ("rate limit", "ip block", ...), which is derived from
+    reasons and action (see TYPE_CONDITIONS)
+    
+    Returns:
+        (condition, params) tuple, condition is "" when there is nothing to filter
+    """
+    search = (search_value or "").strip().lower()
+    if not search:
+        return "", ()
+    
+    cond, params = store.search_condition(search)
+    clauses = [cond]
+    params = list(params)
+    
+    cond, reason_params = store.reasons_condition(search)
+    if cond:
+        clauses.append(cond)
+        params.extend(reason_params)
+    
+    # status column shows allowed/blocked rather than the raw action
+    if search in "allowed":
+        clauses.append("action = 'allow'")
+    if search in "blocked":
+        clauses.append("action != 'allow'")
+    clauses.append("action = ?")
+    params.append(search)
+    
+    # type column: every label containing the search text
+    clauses.extend(f"({cond})" for label, cond in TYPE_CONDITIONS.items() if search in label)
+    
+    # time column: "2025-12-17 06:3" matches every event in that prefix range
+    if TIME_PREFIX.match(search):
+        prefix = search.replace(" ", "T")
+        clauses.append("(ts >= ? AND ts < ?)")
+        params.extend([prefix, prefix + "\uffff"])
+    
+    return " OR ".join(clauses), tuple(params)
+
+
 def _filter_events(events: List[Dict], search_value: str) -> List[Dict]:
     """
     Filter events by search value
@@ -76,40 +197,3 @@ def _filter_events(events: List[Dict], search_value: str) -> List[Dict]:
             filtered.append(event)
     
     return filtered
-
-
-def _sort_events(events: List[Dict], order_column: int, order_dir: str) -> List[Dict]:
-    """
-    Sort events by column
-    
-    Args:
-        events: List of event dictionaries
-        order_column: Column index (0=time, 1=type, 2=source, 3=status)
-        order_dir: Sort direction (asc/desc)
-    
-    Returns:
-        Sorted list of events
-    """
-    # Column mapping
-    column_map = {
-        0: 'time',
-        1: 'type',
-        2: 'source',
-        3: 'status'
-    }
-    
-    sort_key = column_map.get(order_column, 'time')
-    reverse = (order_dir == 'desc')
-    
-    try:
-        # Sort events
-        sorted_events = sorted(
-            events,
-            key=lambda x: x.get(sort_key, ''),
-            reverse=reverse
-        )
-        return sorted_events
-    except Exception as e:
-        # If sorting fails, return unsorted
-        print(f"Sorting error: {e}")
-        return events
\ No newline at end of file
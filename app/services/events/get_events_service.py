@@ -1,42 +1,97 @@
 from pathlib import Path
 from datetime import datetime
-import json
+import heapq
+import threading
+import time
+
+from app.minifw_ai.event_store import EventStore
+from app.minifw_ai.segments import read_recent
 
 BASE_DIR = Path(__file__).resolve().parents[3]
 EVENTS_FILE = BASE_DIR / "logs" / "events.jsonl"
+EVENTS_DB = EVENTS_FILE.with_name("events.db")
+
+_store = None
+_ingester = None
+
+
+def _event_files():
+    """
+    Event log files to read: the main log plus per-worker logs
+    (events.w<N>.jsonl) written when the engine runs sharded, in
+    either the JSONL or the binary (.bin) format
+    """
+    files = []
+    for suffix in (EVENTS_FILE.suffix, ".bin"):
+        main = EVENTS_FILE.with_suffix(suffix)
+        if main.exists():
+            files.append(main)
+        files.extend(sorted(EVENTS_FILE.parent.glob(f"{EVENTS_FILE.stem}.w*{suffix}")))
+    return files
+
+
+def get_event_store() -> EventStore:
+    """
+    Indexed SQLite copy of the event logs, brought up to date with
+    whatever the engine appended since the last call
+    """
+    global _store
+    if _store is None:
+        _store = EventStore(EVENTS_DB)
+    _store.sync(_event_files())
+    return _store
+
+
+def start_event_ingester(interval: float = 5.0):
+    """
+    Keep the event store (rows, counters, rollups, search index) up to
+    date in a background thread, so page loads rarely have to ingest
+    """
+    global _ingester
+    if _ingester is not None:
+        return _ingester
+    
+    def loop():
+        while True:
+            try:
+                if _event_files():
+                    get_event_store()
+            except Exception as e:
+                print(f"Event ingester error: {e}")
+            time.sleep(interval)
+    
+    _ingester = threading.Thread(target=loop, name="minifw-event-ingester", daemon=True)
+    _ingester.start()
+    return _ingester
 
 
 def get_recent_events(limit: int = 100):
     """
-    Get recent security events from JSONL file
-    Returns list of recent events from log file
+    Get recent security events from the event log(s)
+    Returns list of recent events, newest first
+    
+    Each log is appended in time order, so only its last `limit` records
+    are read (backwards from EOF, then from its newest rotated segments
+    if the live file is short) and the per-file lists are merged
     """
-    if not EVENTS_FILE.exists():
+    files = _event_files()
+    if not files:
         # Return sample data if file doesn't exist
         return _get_sample_events()
     
     try:
-        events = []
-        
-        # Read JSONL file (each line is a JSON object)
-        with open(EVENTS_FILE, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                try:
-                    event = json.loads(line)
-                    formatted_event = _format_event(event)
-                    events.append(formatted_event)
-                except json.JSONDecodeError:
-                    continue
-        
-        # Sort by timestamp (newest first)
-        events.sort(key=lambda x: x.get('time', ''), reverse=True)
+        tails = [read_recent(path, limit) for path in files]
+        if len(tails) == 1:
+            newest = tails[0]
+        else:
+            newest = heapq.merge(*tails, key=lambda e: str(e.get('ts', '')), reverse=True)
         
-        # Return limited events
-        return events[:limit]
+        events = []
+        for event in newest:
+            if len(events) >= limit:
+                break
+            events.append(_format_event(event))
+        return events
     
     except (IOError, Exception) as e:
         print(f"Error reading events file: {e}")
@@ -190,29 +245,30 @@ def _get_sample_events():
     ]
 
 
-def get_event_statistics():
+def get_event_statistics(window_minutes: int = None):
     """
     Get event statistics
     Returns counts of allowed, blocked, threats
-    """
-    events = get_recent_events(limit=10000)
-    
-    stats = {
-        'total_allowed': 0,
-        'total_blocked': 0,
-        'threats_detected': 0
-    }
     
-    for event in events:
-        if event.get('status') == 'allowed':
-            stats['total_allowed'] += 1
-        elif event.get('status') == 'blocked':
-            stats['total_blocked'] += 1
-        
-        if event.get('threat_detected', False):
-            stats['threats_detected'] += 1
+    Read from the event store's running counters: all-time totals, or
+    the per-minute buckets of the last `window_minutes` minutes
+    """
+    if not _event_files():
+        # Count the sample data if no log exists yet
+        stats = {'total_allowed': 0, 'total_blocked': 0, 'threats_detected': 0}
+        for event in _get_sample_events():
+            if event.get('status') == 'allowed':
+                stats['total_allowed'] += 1
+            elif event.get('status') == 'blocked':
+                stats['total_blocked'] += 1
+            if event.get('threat_detected', False):
+                stats['threats_detected'] += 1
+        return stats
     
-    return stats
+    since = None
+    if window_minutes:
+        since = int(time.time()) // 60 - int(window_minutes) + 1
+    return get_event_store().counters(since)
 
 
 def get_system_uptime():
@@ -0,0 +1,37 @@
+import time
+from typing import Any, Dict, Optional
+
+from app.services.events.get_events_service import _event_files, get_event_store
+
+
+def get_events_timeseries(
+    range_minutes: int = 60 * 24,
+    end: Optional[int] = None,
+    resolution: Optional[int] = None,
+    group_by: str = "action",
+    segment: Optional[str] = None,
+    action: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Event counts over time for dashboard charts, read from the rollup
+    tables (never from raw events)
+    
+    Args:
+        range_minutes: Length of the window ending at `end`
+        end: Window end as epoch seconds (now if None)
+        resolution: Bucket size in seconds (60, 3600 or 86400); picked
+            from the window length if None
+        group_by: One series per action, segment or reason
+        segment: Only count this segment
+        action: Only count this action
+    
+    Returns:
+        Dict with resolution, buckets (epoch seconds) and series
+        ({name: [count per bucket]})
+    """
+    end = int(end if end is not None else time.time())
+    start = end - max(int(range_minutes), 1) * 60
+    if not _event_files():
+        return {"resolution": resolution or 60, "buckets": [], "series": {}}
+    return get_event_store().series(start, end + 1, res=resolution, group_by=group_by,
+                                    segment=segment, action=action)
@@ -0,0 +1,59 @@
+from typing import List
+
+from app.minifw_ai.metrics import Registry, merge_exposition, listen_for_shard, scrape
+from app.services.policy.get_policy_service import get_policy
+
+# Metrics of the web app process itself
+WEB_REGISTRY = Registry()
+HTTP_REQUESTS = WEB_REGISTRY.counter(
+    "minifw_web_requests_total", "HTTP requests handled by the admin app", ("method", "route", "status")
+)
+HTTP_SECONDS = WEB_REGISTRY.histogram(
+    "minifw_web_request_seconds", "HTTP request latency of the admin app", ("route",)
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    """Record one handled request (called from the app middleware)"""
+    HTTP_REQUESTS.labels(method, route, status).inc()
+    HTTP_SECONDS.labels(route).observe(seconds)
+
+
+def get_engine_targets() -> List[str]:
+    """
+    Engine metrics endpoints from policy.json: the main process plus one
+    per worker when the engine runs sharded
+    """
+    try:
+        policy = get_policy()
+    except ValueError:
+        return []
+
+    listen = policy.get("metrics", {}).get("listen", "127.0.0.1:9108")
+    if not listen:
+        return []
+
+    workers = int(policy.get("engine", {}).get("workers", 1))
+    targets = [listen]
+    if workers > 1:
+        targets.extend(listen_for_shard(listen, i) for i in range(workers))
+    return targets
+
+
+def get_metrics_text() -> str:
+    """
+    Combined exposition: web app metrics plus a live scrape of the engine
+    """
+    texts = [WEB_REGISTRY.render()]
+    up = []
+    for target in get_engine_targets():
+        text = scrape(target)
+        up.append(f'minifw_engine_up{{target="{target}"}} {1 if text else 0}')
+        if text:
+            texts.append(text)
+
+    texts.append(
+        "# HELP minifw_engine_up Whether the engine metrics endpoint answered\n"
+        "# TYPE minifw_engine_up gauge\n" + "\n".join(up) + "\n"
+    )
+    return merge_exposition(texts)
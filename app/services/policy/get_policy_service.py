@@ -2,6 +2,8 @@ import json
 import os
 from typing import Dict, Any
 
+from app.minifw_ai.netutil import SubnetTable
+
 def get_policy() -> Dict[str, Any]:
     """Get complete policy configuration"""
     policy_path = os.environ.get("MINIFW_POLICY", "config/policy.json")
@@ -43,3 +45,14 @@ def get_burst() -> Dict[str, int]:
     """Get burst detection configuration"""
     policy = get_policy()
     return policy.get("burst", {})
+
+def get_segment_for_ip(ip: str) -> str:
+    """Resolve which segment a client IP falls into (longest prefix match)"""
+    import ipaddress
+
+    try:
+        ipaddress.ip_address(ip)
+    except ValueError:
+        raise ValueError(f"Invalid IP address: {ip}")
+
+    return SubnetTable(get_segment_subnets()).lookup(ip)
@@ -20,9 +20,11 @@ def _save_policy(policy_data: Dict[str, Any]):
     # Create backup first
     _backup_policy()
     
-    # Save new policy
-    with open(policy_path, 'w') as f:
+    # Save new policy via rename so the engine's hot reload never reads a half-written file
+    tmp_path = f"{policy_path}.tmp"
+    with open(tmp_path, 'w') as f:
         json.dump(policy_data, f, indent=2)
+    os.replace(tmp_path, policy_path)
 
 def update_segment(segment_name: str, block_threshold: int, monitor_threshold: int):
     """Update or add a segment configuration"""
@@ -141,12 +143,13 @@ def update_enforcement(ipset_name_v4: str, ip_timeout_seconds: int, nft_table: s
     
     policy = get_policy()
     
-    policy["enforcement"] = {
+    # Keep engine tuning keys (batch_*) that are not edited from the UI
+    policy.setdefault("enforcement", {}).update({
         "ipset_name_v4": ipset_name_v4,
         "ip_timeout_seconds": ip_timeout_seconds,
         "nft_table": nft_table,
         "nft_chain": nft_chain
-    }
+    })
     
     _save_policy(policy)
 
@@ -156,11 +159,12 @@ def update_collectors(dnsmasq_log_path: str, zeek_ssl_log_path: str, use_zeek_sn
     
     policy = get_policy()
     
-    policy["collectors"] = {
+    # Keep engine-only keys (checkpoint_dir) that are not edited from the UI
+    policy.setdefault("collectors", {}).update({
         "dnsmasq_log_path": dnsmasq_log_path,
         "zeek_ssl_log_path": zeek_ssl_log_path,
         "use_zeek_sni": use_zeek_sni
-    }
+    })
     
     _save_policy(policy)
 
@@ -176,9 +180,10 @@ def update_burst(dns_queries_per_minute_monitor: int, dns_queries_per_minute_blo
     
     policy = get_policy()
     
-    policy["burst"] = {
+    # Keep engine-only keys (max_tracked_clients) that are not edited from the UI
+    policy.setdefault("burst", {}).update({
         "dns_queries_per_minute_monitor": dns_queries_per_minute_monitor,
         "dns_queries_per_minute_block": dns_queries_per_minute_block
-    }
+    })
     
     _save_policy(policy)
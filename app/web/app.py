@@ -1,9 +1,13 @@
+import time
+
 from fastapi import FastAPI, Depends, Request
 from fastapi.responses import RedirectResponse
 from fastapi.exceptions import HTTPException
 from fastapi.exception_handlers import http_exception_handler
 
-from app.web.routers import health, status, admin, auth
+from app.web.routers import health, status, admin, auth, metrics
+from app.services.metrics.metrics_service import observe_request
+from app.services.events.get_events_service import start_event_ingester
 from fastapi.staticfiles import StaticFiles
 from app.database import init_db
 from app.middleware.auth_middleware import require_auth
@@ -16,6 +20,12 @@ app = FastAPI(
 # Initialize database
 init_db()
 
+
+# Tail the engine's event logs into the event store in the background
+@app.on_event("startup")
+def start_background_ingest():
+    start_event_ingester()
+
 for route in app.routes:
     print(route.path, route.methods)
 
@@ -32,6 +42,17 @@ async def custom_http_exception_handler(request: Request, exc: HTTPException):
     # Untuk request lainnya, return normal error
     return await http_exception_handler(request, exc)
 
+# Request metrics for /metrics
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    # label by route template, not raw path, to keep cardinality bounded
+    observe_request(request.method, getattr(route, "path", "unmatched"), response.status_code,
+                    time.perf_counter() - start)
+    return response
+
 # static adminlte
 app.mount(
     "/static",
@@ -45,6 +66,7 @@ app.include_router(auth.router)  # Auth router - TIDAK DI-PROTECT
 app.include_router(admin.router, dependencies=[Depends(require_auth)])  # Admin protected
 app.include_router(health.router, prefix="/health", tags=["Health"])
 app.include_router(status.router, prefix="/status", tags=["Status"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
 
 
 @app.get("/")
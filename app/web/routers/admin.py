@@ -1,3 +1,4 @@
+from typing import Optional
 from fastapi import APIRouter, Request, Depends
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
@@ -30,7 +31,13 @@ from app.controllers.admin.deny_domain_controller import (
 )
 
 from app.controllers.admin.events_controller import events_controller
-from app.controllers.admin.events_api_controller import events_datatable_controller
+from app.controllers.admin.events_api_controller import (
+    events_datatable_controller,
+    events_stats_controller,
+    events_timeseries_controller,
+    events_export_controller,
+    events_export_status_controller
+)
 from app.controllers.admin.policy_controller import (
     policy_controller,
     add_segment_controller,
@@ -39,7 +46,8 @@ from app.controllers.admin.policy_controller import (
     update_features_controller,
     update_enforcement_controller,
     update_collectors_controller,
-    update_burst_controller
+    update_burst_controller,
+    segment_lookup_controller
 )
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -117,6 +125,9 @@ class UpdateBurstRequest(BaseModel):
     dns_queries_per_minute_monitor: int
     dns_queries_per_minute_block: int
 
+class ExportEventsRequest(BaseModel):
+    format: Optional[str] = None
+
 
 @router.get("/")
 def dashboard(request: Request):
@@ -217,7 +228,8 @@ def api_get_events(
     length: int = 10,
     search_value: str = "",
     order_column: int = 0,
-    order_dir: str = "desc"
+    order_dir: str = "desc",
+    cursor: Optional[str] = None
 ):
     """API endpoint for DataTables server-side processing"""
     return events_datatable_controller(
@@ -226,14 +238,56 @@ def api_get_events(
         length=length,
         search_value=search_value,
         order_column=order_column,
-        order_dir=order_dir
+        order_dir=order_dir,
+        cursor=cursor
     )
 
+
+# Events summary counters
+@router.get("/api/events/stats")
+def api_get_events_stats(window_minutes: Optional[int] = None):
+    return events_stats_controller(window_minutes)
+
+
+# Events chart data (from the rollup tables)
+@router.get("/api/events/timeseries")
+def api_get_events_timeseries(
+    range_minutes: int = 1440,
+    end: Optional[int] = None,
+    resolution: Optional[int] = None,
+    group_by: str = "action",
+    segment: Optional[str] = None,
+    action: Optional[str] = None
+):
+    return events_timeseries_controller(
+        range_minutes=range_minutes,
+        end=end,
+        resolution=resolution,
+        group_by=group_by,
+        segment=segment,
+        action=action
+    )
+
+
+# Columnar export of closed event segments (runs in the background)
+@router.post("/api/events/export")
+def api_post_events_export(payload: ExportEventsRequest):
+    return events_export_controller(payload.format)
+
+
+@router.get("/api/events/export")
+def api_get_events_export():
+    return events_export_status_controller()
+
 # Policy Configuration routes
 @router.get("/policy")
 def get_policy(request: Request):
     return policy_controller(request)
 
+@router.get("/policy/segment-lookup")
+def get_segment_lookup(ip: str):
+    return segment_lookup_controller(ip)
+
 @router.post("/policy/segment")
 def post_segment(payload: AddSegmentRequest):
     add_segment_controller(payload.segment_name, payload.block_threshold, payload.monitor_threshold)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.minifw_ai.metrics import CONTENT_TYPE
+from app.services.metrics.metrics_service import get_metrics_text
+
+router = APIRouter()
+
+# "" rather than "/" so scrapers hitting /metrics are not redirected
+@router.get("", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(get_metrics_text(), media_type=CONTENT_TYPE)
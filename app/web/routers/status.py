@@ -1,11 +1,23 @@
+import os
+
 from fastapi import APIRouter
 from app.minifw_ai import policy, events
+from app.services.metrics.metrics_service import get_engine_targets
+from app.minifw_ai.metrics import scrape
 
 router = APIRouter()
 
 @router.get("/")
 def system_status():
+    policy_error = None
+    try:
+        policy.Policy(os.environ.get("MINIFW_POLICY", "config/policy.json")).validate()
+    except Exception as e:
+        policy_error = str(e)
+
+    targets = get_engine_targets()
     return {
-        "policy_loaded": True,
-        "events_active": True
+        "policy_loaded": policy_error is None,
+        "policy_error": policy_error,
+        "events_active": bool(targets) and bool(scrape(targets[0], timeout=0.5))
     }